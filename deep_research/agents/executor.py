@@ -1,14 +1,50 @@
 # agents/executor.py
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from typing import Dict, Any, List
+from dataclasses import asdict, dataclass
+from typing import Dict, Any, List, Optional
 import asyncio
 import time
 
+from deep_research.config import (
+    EXECUTOR_MODE,
+    STREAM_EARLY_EVAL_FRACTION,
+    SUFFICIENCY_CONFIDENCE_THRESHOLD,
+    MAX_RETRY_EXTRACTIONS,
+    RETRY_TOKEN_BUDGET,
+    SNIPPET_TOKEN_BUDGET
+)
 from deep_research.state import ResearchState, TaskResult, ResearchTask
+from deep_research.checkpoint import journaled_task
+from deep_research.agents.observer import IncrementalObserver
+from deep_research.context import other_task_context
+from deep_research.events import emit
 from deep_research.output_schemas import TaskExecutionOutput
-from deep_research.tools.search import tavily_search, extract_content
-from deep_research.config import NEBIUS_API_KEY
+from deep_research.tools.blobs import externalize_result, resolve_result
+from deep_research.tools.dedup import dedupe_results
+from deep_research.tools.passages import select_passages
+from deep_research.tools.search import extract_contents
+from deep_research.tools.search_policy import adaptive_search
+from deep_research.tools.task_cache import get_task_cache
+from deep_research.llm import run_structured
+from deep_research.resilience import UpstreamError
+from deep_research.telemetry import span
+
+
+@dataclass
+class RetryStats:
+    """How often snippet reasoning needed a full-content retry"""
+    tasks: int = 0
+    retries: int = 0
+    fields_retried: int = 0
+    urls_extracted: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        stats = asdict(self)
+        stats["retry_rate"] = self.retries / self.tasks if self.tasks else 0.0
+        return stats
+
+
+retry_stats = RetryStats()
 
 
 async def task_executor_node(state: ResearchState) -> Dict[str, Any]:
@@ -23,13 +59,16 @@ async def task_executor_node(state: ResearchState) -> Dict[str, Any]:
     print(f"\nExecuting {len(tasks)} tasks in parallel...\n")
     
     # Run async execution - REMOVE asyncio.run(), just await directly
-    task_results = await execute_all_tasks(tasks, state)
+    if EXECUTOR_MODE == "streaming":
+        update = await execute_tasks_streaming(tasks, state)
+    else:
+        update = {"task_results": await execute_all_tasks(tasks, state)}
     
     execution_time = time.time() - start_time
     print(f"All tasks completed in {execution_time:.2f}s")
     
     return {
-        "task_results": task_results,
+        **update,
         "execution_time": state.get("execution_time", 0) + execution_time
     }
 
@@ -42,7 +81,7 @@ async def execute_all_tasks(
     Execute all tasks concurrently using asyncio
     """
     task_coroutines = [
-        execute_single_task(task, state) 
+        timed_task(task, state) 
         for task in tasks
     ]
     
@@ -51,15 +90,7 @@ async def execute_all_tasks(
     task_results = []
     for i, result in enumerate(results):
         if isinstance(result, Exception):
-            task_id = tasks[i]['task_id']
-            print(f"Task {task_id} failed: {result}")
-            task_results.append({
-                "task_id": task_id,
-                "search_results": [],
-                "reasoning": f"Task failed: {str(result)}",
-                "structured_output": {},
-                "citations": []
-            })
+            task_results.append(failed_task_result(tasks[i], result))
         else:
             task_results.append(result)
             print(f"Task {result['task_id']} completed")
@@ -67,6 +98,138 @@ async def execute_all_tasks(
     return task_results
 
 
+async def execute_tasks_streaming(
+    tasks: List[ResearchTask],
+    state: ResearchState
+) -> Dict[str, Any]:
+    """
+    Execute tasks and observe each result as soon as it finishes
+
+    Once STREAM_EARLY_EVAL_FRACTION of the tasks are done (and others are
+    still running), the observer evaluates the partial results. Follow-up
+    tasks for any gaps it finds start immediately alongside the rest of the
+    first wave, consuming the next iteration. A complete verdict is returned
+    as `early_verdict` for observer_node to reuse.
+    """
+    iteration = state.get("iteration_count", 0)
+    can_follow_up = iteration + 1 < state.get("max_iterations", 1)
+    observer = IncrementalObserver(state)
+    
+    first_wave = {asyncio.ensure_future(run_task(task, state)) for task in tasks}
+    pending = set(first_wave)
+    evaluation = None
+    verdict: Dict[str, Any] = {}
+    follow_ups: List[ResearchTask] = []
+    task_results: list[TaskResult] = []
+    
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        
+        for future in done:
+            if future is evaluation:
+                verdict = early_verdict(future)
+                follow_ups = [] if verdict.get("is_complete", True) else verdict["follow_up_tasks"]
+                if follow_ups:
+                    print(f"Early gaps found. Starting {len(follow_ups)} follow-up tasks now...")
+                    # Follow-ups can see everything completed so far
+                    follow_up_state = {
+                        **state,
+                        "task_results": state.get("task_results", []) + task_results
+                    }
+                    pending.update(
+                        asyncio.ensure_future(run_task(task, follow_up_state))
+                        for task in follow_ups
+                    )
+                continue
+            
+            result = future.result()
+            task_results.append(result)
+            observer.add(result)
+            print(f"Task {result['task_id']} completed ({len(task_results)} done)")
+        
+        if (
+            can_follow_up
+            and evaluation is None
+            and pending & first_wave
+            and len(task_results) >= STREAM_EARLY_EVAL_FRACTION * len(tasks)
+        ):
+            evaluation = asyncio.ensure_future(observer.evaluate())
+            pending.add(evaluation)
+    
+    update: Dict[str, Any] = {
+        "task_results": task_results,
+        "early_verdict": verdict if verdict.get("is_complete") else {}
+    }
+    if follow_ups:
+        update["tasks"] = list(tasks) + follow_ups
+        update["iteration_count"] = iteration + 1
+    return update
+
+
+def early_verdict(evaluation: asyncio.Future) -> Dict[str, Any]:
+    """Result of a finished early evaluation, or {} if it failed"""
+    try:
+        return evaluation.result()
+    except Exception as e:
+        print(f"Early evaluation failed: {e}")
+        return {}
+
+
+async def run_task(task: ResearchTask, state: ResearchState) -> TaskResult:
+    """execute_single_task, turning an exception into a failed TaskResult"""
+    try:
+        return await timed_task(task, state)
+    except Exception as e:
+        return failed_task_result(task, e)
+
+
+async def timed_task(task: ResearchTask, state: ResearchState) -> TaskResult:
+    async with span("task", task_id=task['task_id']):
+        result = await journaled_task(task, state, lambda: reuse_or_execute(task, state))
+    emit(
+        "task_completed",
+        task_id=result['task_id'],
+        key_insights=result['key_insights'],
+        citations=result['citations'],
+        errors=result['errors']
+    )
+    return result
+
+
+async def reuse_or_execute(task: ResearchTask, state: ResearchState) -> TaskResult:
+    """A stored result from an earlier run of a near-identical task, else a fresh execution"""
+    task_cache = get_task_cache()
+    if task_cache is None:
+        return await execute_single_task(task, state)
+    
+    hit = task_cache.lookup(task)
+    if hit is not None:
+        similarity, stored = hit
+        print(f"\nTask {task['task_id']}: reusing a cached result (similarity {similarity:.2f})")
+        # Page text is stored inline, since the run that produced it has released its blobs
+        search_results = [externalize_result(r) for r in stored['search_results']]
+        return {**stored, "task_id": task['task_id'], "search_results": search_results}
+    
+    result = await execute_single_task(task, state)
+    if not result['errors']:
+        task_cache.store(task, {**result, "search_results": [resolve_result(r) for r in result['search_results']]})
+    return result
+
+
+def failed_task_result(task: ResearchTask, error: Exception) -> TaskResult:
+    print(f"Task {task['task_id']} failed: {error}")
+    emit("task_failed", task_id=task['task_id'], error=str(error))
+    return {
+        "task_id": task['task_id'],
+        "search_results": [],
+        "reasoning": f"Task failed: {str(error)}",
+        "structured_output": {},
+        "citations": [],
+        "key_insights": [],
+        "errors": [str(error)]
+    }
+
+
 async def execute_single_task(
     task: ResearchTask, 
     state: ResearchState
@@ -76,94 +239,141 @@ async def execute_single_task(
     """
     print(f"\nTask {task['task_id']}: {task['description']}")
     
-    # Step 1: Execute all search queries concurrently
-    search_coroutines = [
-        tavily_search(query, max_results=5, search_depth="basic")
-        for query in task['search_queries']
-    ]
+    # Step 1: Execute all search queries concurrently, each escalating on its own if weak
+    search_coroutines = [adaptive_search(query) for query in task['search_queries']]
     
-    search_results_lists = await asyncio.gather(*search_coroutines)
+    search_results_lists = await asyncio.gather(*search_coroutines, return_exceptions=True)
     
+    errors = []
     all_search_results = []
-    for results in search_results_lists:
+    for query, results in zip(task['search_queries'], search_results_lists):
+        if isinstance(results, Exception):
+            errors.append(f"Search failed for '{query}': {results}")
+            continue
         all_search_results.extend(results)
     
-    print(f"Found {len(all_search_results)} results")
+    # The same page often comes back for several queries, or under mirror URLs
+    found = len(all_search_results)
+    all_search_results = dedupe_results(all_search_results)
+    print(f"Found {found} results ({len(all_search_results)} distinct)")
     
-    snippet_sufficient, task_output = await try_reasoning_with_snippets(
-        task=task,
-        search_results=all_search_results,
-        other_task_outputs=get_other_task_outputs(state, task['task_id'])
-    )
+    other_context = other_task_context(state, task)
+    retry_stats.tasks += 1
+    
+    try:
+        snippet_sufficient, task_output = await try_reasoning_with_snippets(
+            task=task,
+            search_results=all_search_results,
+            other_context=other_context
+        )
+    except UpstreamError as e:
+        print(f"Task execution error: {e}")
+        errors.append(f"Reasoning failed: {e}")
+        snippet_sufficient, task_output = True, TaskExecutionOutput(
+            reasoning=f"Error during execution: {str(e)}",
+            structured_output={},
+            key_insights=[]
+        )
     
     if not snippet_sufficient:
-        print(f"Snippets insufficient, fetching full content...")
+        fields = missing_fields(task, task_output)
+        retry_results = select_retry_results(all_search_results, task_output.needed_urls)
+        # Escalated searches already returned their pages in full
+        extracted = [result for result in retry_results if result.get('full_content')]
+        to_fetch = [result for result in retry_results if not result.get('full_content')]
+        print(f"Snippets insufficient for {fields or 'the task'}, fetching {len(to_fetch)} full pages...")
+        retry_stats.retries += 1
+        retry_stats.fields_retried += len(fields)
+        retry_stats.urls_extracted += len(to_fetch)
         
-        top_results = all_search_results[:3]
-        content_coroutines = [
-            extract_content(result['url']) 
-            for result in top_results
-        ]
-        
-        full_contents = await asyncio.gather(*content_coroutines)
+        full_contents = await extract_contents(
+            [result['url'] for result in to_fetch],
+            return_exceptions=True
+        )
         
-        for i, content in enumerate(full_contents):
-            if content:
-                top_results[i]['content'] = content
+        for result, content in zip(to_fetch, full_contents):
+            if isinstance(content, Exception):
+                errors.append(f"Extraction failed for {result['url']}: {content}")
+            elif content:
+                result['content'] = content
+                extracted.append(result)
         
-        _, task_output = await try_reasoning_with_snippets(
-            task=task,
-            search_results=all_search_results,
-            other_task_outputs=get_other_task_outputs(state, task['task_id']),
-            is_retry=True
-        )
+        if not extracted:
+            print("No full content retrieved, keeping the snippet-based answer")
+        else:
+            try:
+                # Only the missing fields are re-researched, over the pages just fetched
+                _, retry_output = await try_reasoning_with_snippets(
+                    task=task,
+                    search_results=extracted,
+                    other_context=other_context,
+                    is_retry=True,
+                    fields=fields,
+                    previous_output=task_output
+                )
+                task_output = merge_retry_output(task_output, retry_output, fields)
+            except UpstreamError as e:
+                # Keep the snippet-based answer rather than losing the task
+                print(f"Task execution error on retry: {e}")
+                errors.append(f"Retry reasoning failed: {e}")
     
-    citations = list(set([r['url'] for r in all_search_results if r['url']]))
+    # Already distinct and ranked by score, so the top 10 are stable across runs
+    citations = [r['url'] for r in all_search_results if r['url']]
     
     return {
         "task_id": task['task_id'],
-        "search_results": all_search_results,
+        # Page text lives in the blob store; the state only carries references
+        "search_results": [externalize_result(r) for r in all_search_results],
         "reasoning": task_output.reasoning,
         "structured_output": task_output.structured_output,
         "citations": citations[:10],
-        "key_insights": task_output.key_insights
+        "key_insights": task_output.key_insights,
+        "errors": errors
     }
 
 
 async def try_reasoning_with_snippets(
     task: ResearchTask,
     search_results: List[Dict[str, Any]],
-    other_task_outputs: List[Dict[str, Any]],
-    is_retry: bool = False
+    other_context: str,
+    is_retry: bool = False,
+    fields: Optional[List[str]] = None,
+    previous_output: Optional[TaskExecutionOutput] = None
 ) -> tuple[bool, TaskExecutionOutput]:
     """
     Attempt to reason with current search results (async version)
+
+    The model reports its own sufficiency (per-field confidence, missing
+    fields and the URLs it needs), so one call both answers and decides
+    whether a full-content retry is warranted. On a retry, `fields` narrows
+    the output schema to what was missing and `previous_output` is shown as
+    the findings so far.
+
+    Raises UpstreamError if the LLM call fails after retries.
     """
     
+    # Rank passages against the task (and the fields still missing on a retry)
+    relevance_queries = [task['description'], *task['search_queries'], *(fields or [])]
+    token_budget = RETRY_TOKEN_BUDGET if is_retry else SNIPPET_TOKEN_BUDGET
+    passages = select_passages(search_results, relevance_queries, token_budget)
+    
     search_context = "\n\n".join([
-        f"Source [{i+1}]: {r['title']}\nURL: {r['url']}\nContent: {r['content'][:500]}..."
-        for i, r in enumerate(search_results)
+        f"Source [{i+1}]: {r['title']}\nURL: {r['url']}\nContent: {r['content']}"
+        for i, r in enumerate(passages)
     ])
     
-    other_context = ""
-    if other_task_outputs:
-        other_context = "\n\nOther completed research:\n" + "\n".join([
-            f"- {out['task_id']}: {out['structured_output']}"
-            for out in other_task_outputs
-        ])
-    
-    llm = ChatOpenAI(
-        model="meta-llama/Llama-3.3-70B-Instruct",
-        temperature=0,
-        api_key=NEBIUS_API_KEY,
-        base_url="https://api.studio.nebius.ai/v1/"
-    )
+    if other_context:
+        other_context = f"\n\nOther completed research:\n{other_context}"
+    if previous_output is not None:
+        other_context += f"\n\nFindings so far for this task:\n{previous_output.structured_output}"
     
-    structured_llm = llm.with_structured_output(TaskExecutionOutput)
+    output_schema = task['output_schema']
+    if fields and isinstance(output_schema, dict):
+        output_schema = {k: v for k, v in output_schema.items() if k in fields} or output_schema
     
     content_type = "full content" if is_retry else "snippets"
-    snippet_note = "" if is_retry else "If you find the snippets insufficient to confidently answer, indicate this in your reasoning."
-    instruction = "Produce your best findings with the available information." if is_retry else "If snippets are insufficient, explain what you need."
+    snippet_note = "" if is_retry else """Report honestly how well the snippets support each field: give a 0-1 confidence per output schema field, list fields you could not answer in missing_fields, set is_sufficient to false if any are missing, and put the URLs whose full page would fill them in needed_urls."""
+    instruction = "Produce your best findings for the requested fields with the available information." if is_retry else "Fill in the sufficiency fields (is_sufficient, field_confidence, missing_fields, needed_urls)."
     
     prompt = ChatPromptTemplate.from_messages([
         ("system", f"""You are a research task executor. Analyze the search results and produce structured findings.
@@ -191,50 +401,70 @@ Instructions:
 Generate your structured output now.""")
     ])
     
-    chain = prompt | structured_llm
+    # The snippet pass also judges sufficiency; "executor.snippets" / "executor.retry" can be routed separately
+    result: TaskExecutionOutput = await run_structured("executor", prompt, {
+        "description": task['description'],
+        "output_schema": output_schema,
+        "search_context": search_context,
+        "other_context": other_context
+    }, call_type="retry" if is_retry else "snippets")
     
-    try:
-        result: TaskExecutionOutput = await chain.ainvoke({
-            "description": task['description'],
-            "output_schema": task['output_schema'],
-            "search_context": search_context,
-            "other_context": other_context
-        })
-        
-        insufficient_indicators = [
-            "insufficient", "need more", "require full", 
-            "snippets are limited", "unclear", "cannot determine"
-        ]
-        
-        is_insufficient = any(
-            indicator in result.reasoning.lower() 
-            for indicator in insufficient_indicators
-        )
-        
-        if is_retry:
-            return True, result
-        
-        is_sufficient = not is_insufficient
-        return is_sufficient, result
+    if is_retry:
+        return True, result
     
-    except Exception as e:
-        print(f"Task execution error: {e}")
-        return True, TaskExecutionOutput(
-            reasoning=f"Error during execution: {str(e)}",
-            structured_output={},
-            key_insights=[]
-        )
+    is_sufficient = result.is_sufficient and not missing_fields(task, result)
+    return is_sufficient, result
 
 
-def get_other_task_outputs(state: ResearchState, current_task_id: str) -> List[Dict[str, Any]]:
-    """
-    Get outputs from other completed tasks (limited view per article)
-    """
-    other_outputs = []
-    for result in state.get("task_results", []):
-        if result['task_id'] != current_task_id:
-            other_outputs.append({
-                "task_id": result['task_id'],
-                "structured_output": result['structured_output']
-            })
-    return other_outputs
\ No newline at end of file
+def missing_fields(task: ResearchTask, output: TaskExecutionOutput) -> List[str]:
+    """Schema fields the model marked missing or answered with low confidence"""
+    fields = list(output.missing_fields)
+    for field, confidence in output.field_confidence.items():
+        if confidence < SUFFICIENCY_CONFIDENCE_THRESHOLD and field not in fields:
+            fields.append(field)
+    
+    schema = task['output_schema']
+    if isinstance(schema, dict) and schema:
+        fields = [f for f in fields if f in schema]
+    return fields
+
+
+def select_retry_results(
+    search_results: List[Dict[str, Any]],
+    needed_urls: List[str]
+) -> List[Dict[str, Any]]:
+    """Results to extract: the ones the model asked for, else the top results"""
+    by_url = {r['url']: r for r in search_results if r['url']}
+    selected = []
+    for url in needed_urls:
+        # Only URLs we actually returned - never fetch something the model made up
+        if url in by_url and by_url[url] not in selected:
+            selected.append(by_url[url])
+    if not selected:
+        selected = search_results
+    return selected[:MAX_RETRY_EXTRACTIONS]
+
+
+def merge_retry_output(
+    first: TaskExecutionOutput,
+    retry: TaskExecutionOutput,
+    fields: List[str]
+) -> TaskExecutionOutput:
+    """Fold the retry's answers for the missing fields into the first output"""
+    structured_output = dict(first.structured_output)
+    if fields:
+        structured_output.update({k: v for k, v in retry.structured_output.items() if k in fields})
+    else:
+        structured_output.update(retry.structured_output)
+    
+    key_insights = list(dict.fromkeys(first.key_insights + retry.key_insights))
+    
+    return TaskExecutionOutput(
+        reasoning=f"{first.reasoning}\n\nAfter reading full sources: {retry.reasoning}",
+        structured_output=structured_output,
+        key_insights=key_insights[:5],
+        is_sufficient=True,
+        field_confidence={**first.field_confidence, **retry.field_confidence},
+        missing_fields=[],
+        needed_urls=[]
+    )
@@ -1,9 +1,9 @@
 from typing import Any
 
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from deep_research.config import NEBIUS_API_KEY
-from deep_research.output_schemas import ResearchEvaluation
+from deep_research.context import build_full_context, research_summary
+from deep_research.events import emit
+from deep_research.llm import run_structured
 from deep_research.state import ResearchState, TaskResult
 
 
@@ -12,11 +12,25 @@ async def observer_node(state: ResearchState) -> dict[str, Any]:
     
     full_context = build_full_context(state)
     
-    evaluation = await evaluate_research_completeness(
-        query=state["query"],
-        research_plan=state["research_plan"],
-        task_results=state["task_results"],
-        iteration_count=state["iteration_count"]
+    evaluation = state.get("early_verdict") or {}
+    if evaluation.get("is_complete"):
+        # The streaming executor judged part of these results complete already;
+        # the rest can only add to them, so a second evaluation is not needed
+        print("Early evaluation found the research complete. Skipping re-evaluation.")
+    else:
+        evaluation = await evaluate_research_completeness(
+            query=state["query"],
+            research_plan=state["research_plan"],
+            task_results=state["task_results"],
+            iteration_count=state["iteration_count"]
+        )
+    
+    emit(
+        "verdict",
+        is_complete=evaluation["is_complete"],
+        confidence=evaluation["confidence"],
+        gaps=evaluation["gaps"],
+        follow_up_tasks=[t["description"] for t in evaluation["follow_up_tasks"]]
     )
     
     # 3. Decide next steps
@@ -26,7 +40,8 @@ async def observer_node(state: ResearchState) -> dict[str, Any]:
             "full_context": full_context,
             "research_complete": True,
             "identified_gaps": [],
-            "follow_up_tasks": []
+            "follow_up_tasks": [],
+            "early_verdict": {}
         }
     else:
         print(f"Research gaps identified: {evaluation['gaps']}")
@@ -37,23 +52,35 @@ async def observer_node(state: ResearchState) -> dict[str, Any]:
             "research_complete": False,
             "identified_gaps": evaluation["gaps"],
             "follow_up_tasks": evaluation["follow_up_tasks"],
-            "iteration_count": state["iteration_count"] + 1
+            "iteration_count": state["iteration_count"] + 1,
+            "early_verdict": {}
         }
     
-def build_full_context(state: ResearchState) -> str:
-    """Build comprehensive context string"""
-    parts = []
-    parts.append(f"## Original Query\n{state['query']}\n")
-    parts.append(f"## Research Plan\n{state['research_plan']}\n")
-    
-    parts.append("## Task Execution Results\n")
-    for result in state["task_results"]:
-        parts.append(f"\n### Task {result['task_id']}\n")
-        parts.append(f"**Reasoning**: {result['reasoning']}\n")
-        parts.append(f"**Findings**: {result['structured_output']}\n")
-        parts.append(f"**Citations**: {result['citations']}\n")
-    
-    return "\n".join(parts)
+class IncrementalObserver:
+    """
+    Observer view that is updated one TaskResult at a time
+
+    Used by the streaming executor: each finished task is added as it
+    arrives, and gap analysis can run on whatever has completed so far.
+    A complete verdict is handed on as `early_verdict`, so observer_node
+    does not evaluate the same iteration again; a verdict with gaps is
+    not, since the follow-ups it starts still need judging.
+    """
+
+    def __init__(self, state: ResearchState):
+        self.state = state
+        self.results: list[TaskResult] = list(state["task_results"])
+
+    def add(self, result: TaskResult) -> None:
+        self.results.append(result)
+
+    async def evaluate(self) -> dict[str, Any]:
+        return await evaluate_research_completeness(
+            query=self.state["query"],
+            research_plan=self.state["research_plan"],
+            task_results=self.results,
+            iteration_count=self.state.get("iteration_count", 0)
+        )
 
 
 async def evaluate_research_completeness(
@@ -62,20 +89,6 @@ async def evaluate_research_completeness(
     task_results: list[TaskResult],
     iteration_count: int
 ) -> dict[str, Any]:
-    # Build summary of current research
-    research_summary = "\n\n".join([
-        f"Task {r['task_id']}:\n{r['reasoning'][:300]}..."
-        for r in task_results
-    ])
-    
-    llm = ChatOpenAI(
-        model="meta-llama/Llama-3.3-70B-Instruct",
-        temperature=0,
-        api_key=NEBIUS_API_KEY,
-        base_url="https://api.studio.nebius.ai/v1/"
-    )
-    
-    structured_llm = llm.with_structured_output(ResearchEvaluation)
     
     prompt = ChatPromptTemplate.from_messages([
         ("system", """You are a research quality evaluator. Assess if the research comprehensively answers the query.
@@ -98,13 +111,11 @@ Research Completed (Iteration {iteration}):
 Evaluate: Is this research complete enough to produce a final report?""")
     ])
     
-    chain = prompt | structured_llm
-    
-    evaluation = await chain.ainvoke({
+    evaluation = await run_structured("observer", prompt, {
         "query": query,
         "research_plan": research_plan,
         "iteration": iteration_count + 1,
-        "research_summary": research_summary
+        "research_summary": research_summary(query, task_results)
     })
     
     follow_up_tasks = []
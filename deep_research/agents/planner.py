@@ -1,11 +1,15 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from typing import Dict, Any
+from pydantic import TypeAdapter, ValidationError
+from typing import Dict, Any, Optional
+import asyncio
 import time
 
-from deep_research.config import NEBIUS_API_KEY
-from deep_research.output_schemas import PlannerOutput
-from deep_research.state import ResearchState
+from deep_research.agents.executor import run_task
+from deep_research.config import FOLLOW_UP_MODE, FOLLOW_UP_QUERIES_PER_TASK
+from deep_research.events import emit
+from deep_research.llm import run_structured, stream_structured
+from deep_research.output_schemas import FollowUpQueries, PlannerOutput
+from deep_research.state import ResearchState, ResearchTask
 
 
 async def planner_node(state: ResearchState) -> Dict[str, Any]:
@@ -19,15 +23,128 @@ async def planner_node(state: ResearchState) -> Dict[str, Any]:
     
     start_time = time.time()
     query = state["query"]
+    prompt = build_planner_prompt(state)
     
-    llm = ChatOpenAI(
-        model="meta-llama/Llama-3.3-70B-Instruct",
-        temperature=0,
-        api_key=NEBIUS_API_KEY,
-        base_url="https://api.studio.nebius.ai/v1/"
-    )
+    try:
+        result: PlannerOutput = await run_structured("planner", prompt, {"query": query})
+        
+        log_plan(result)
+        emit_plan(result, iteration)
+        
+        execution_time = time.time() - start_time
+        
+        return {
+            "research_plan": result.research_plan if not is_follow_up else state["research_plan"],
+            "tasks": [task for task in result.tasks],
+            "execution_time": state.get("execution_time", 0) + execution_time,
+            "iteration_count": iteration
+        }
+    
+    except Exception as e:
+        print(f"\nPlanner Error: {e}")
+        raise
+
+
+async def streaming_planner_node(state: ResearchState) -> Dict[str, Any]:
+    """
+    Planner that hands each task to the executor as soon as it is written
+
+    The plan is streamed as partial JSON; a task is complete once the model
+    has started writing the next one, so it is dispatched right away while
+    the rest of the plan is still generating. Returns the executed
+    task_results along with the plan, so the graph goes straight to the
+    observer.
+    """
+    iteration = state.get("iteration_count", 0)
+    is_follow_up = iteration > 0
+    
+    if is_follow_up:
+        print(f"PLANNER (Iteration {iteration + 1}): Streaming follow-up research plan...")
+    else:
+        print("PLANNER: Streaming research plan and starting tasks as they arrive...")
+    
+    start_time = time.time()
+    query = state["query"]
+    prompt = build_planner_prompt(state)
+    
+    dispatched: list[ResearchTask] = []
+    running: list[asyncio.Future] = []
+    
+    def dispatch(task: ResearchTask) -> None:
+        print(f"  Dispatching task {task['task_id']} ({time.time() - start_time:.2f}s into planning)")
+        dispatched.append(task)
+        emit("task_started", task_id=task['task_id'], description=task['description'])
+        running.append(asyncio.ensure_future(run_task(task, state)))
+    
+    try:
+        final: Dict[str, Any] = {}
+        try:
+            async for partial in stream_structured("planner", prompt, {"query": query}):
+                final = partial
+                tasks = partial.get("tasks") or []
+                # Every task before the last one in the partial list is finished
+                while len(dispatched) < len(tasks) - 1:
+                    task = complete_task(tasks[len(dispatched)])
+                    if task is None:
+                        break
+                    dispatch(task)
+            result = PlannerOutput.model_validate(final)
+        except Exception as e:
+            if dispatched:
+                raise
+            # Nothing started yet, so the regular (retried) call is a safe fallback
+            print(f"Plan streaming failed, falling back to a full planner call: {e}")
+            result = await run_structured("planner", prompt, {"query": query})
+        
+        for task in result.tasks[len(dispatched):]:
+            dispatch(task)
+        
+        log_plan(result)
+        emit_plan(result, iteration)
+        task_results = await asyncio.gather(*running)
+        
+        execution_time = time.time() - start_time
+        print(f"Plan and {len(task_results)} tasks completed in {execution_time:.2f}s")
+        
+        return {
+            "research_plan": result.research_plan if not is_follow_up else state["research_plan"],
+            "tasks": dispatched,
+            "task_results": task_results,
+            "execution_time": state.get("execution_time", 0) + execution_time,
+            "iteration_count": iteration
+        }
     
-    structured_llm = llm.with_structured_output(PlannerOutput)
+    except Exception as e:
+        for future in running:
+            future.cancel()
+        print(f"\nPlanner Error: {e}")
+        raise
+
+
+def emit_plan(result: PlannerOutput, iteration: int) -> None:
+    emit(
+        "plan",
+        iteration=iteration + 1,
+        research_plan=result.research_plan,
+        tasks=[{"task_id": t['task_id'], "description": t['description']} for t in result.tasks]
+    )
+
+
+_task_adapter = TypeAdapter(ResearchTask)
+
+
+def complete_task(partial_task: Any) -> Optional[ResearchTask]:
+    """Validated ResearchTask from streamed JSON, or None if it doesn't parse"""
+    try:
+        return _task_adapter.validate_python(partial_task)
+    except ValidationError:
+        return None
+
+
+def build_planner_prompt(state: ResearchState) -> ChatPromptTemplate:
+    """Initial or follow-up planning prompt for the current iteration"""
+    query = state["query"]
+    is_follow_up = state.get("iteration_count", 0) > 0
     
     if is_follow_up:
         # Follow-up planning - refine based on gaps
@@ -92,30 +209,68 @@ Be strategic and thorough."""
         ("human", human_prompt)
     ])
     
-    chain = prompt | structured_llm
+    return prompt
+
+
+def log_plan(result: PlannerOutput) -> None:
+    print(f"Research Strategy:")
+    print(f"{result.research_plan}\n")
     
-    try:
-        result: PlannerOutput = await chain.ainvoke({"query": query})
-        
-        # Log the plan
-        print(f"Research Strategy:")
-        print(f"{result.research_plan}\n")
-        
-        print(f"📌 Generated {len(result.tasks)} tasks:")
-        for task in result.tasks:
-            print(f"\n  Task {task['task_id']}:")
-            print(f"  - Description: {task['description']}")
-            print(f"  - Search Queries: {task['search_queries']}")
-        
+    print(f"📌 Generated {len(result.tasks)} tasks:")
+    for task in result.tasks:
+        print(f"\n  Task {task['task_id']}:")
+        print(f"  - Description: {task['description']}")
+        print(f"  - Search Queries: {task['search_queries']}")
+
+
+async def follow_up_node(state: ResearchState) -> Dict[str, Any]:
+    """
+    Fast path for follow-up iterations: run the observer's follow-up tasks
+    without a full re-plan, optionally expanding their search queries
+    """
+    follow_ups = [dict(task) for task in state.get("follow_up_tasks", [])]
+    print(f"FOLLOW-UP (Iteration {state.get('iteration_count', 0) + 1}): Dispatching {len(follow_ups)} observer tasks...")
+    
+    if FOLLOW_UP_MODE == "refine" and follow_ups:
+        start_time = time.time()
+        try:
+            follow_ups = await refine_follow_up_queries(state["query"], follow_ups)
+        except Exception as e:
+            # The observer's tasks are still runnable as-is
+            print(f"Query refinement failed, using original queries: {e}")
         execution_time = time.time() - start_time
-        
         return {
-            "research_plan": result.research_plan if not is_follow_up else state["research_plan"],
-            "tasks": [task for task in result.tasks],
-            "execution_time": state.get("execution_time", 0) + execution_time,
-            "iteration_count": iteration
+            "tasks": follow_ups,
+            "execution_time": state.get("execution_time", 0) + execution_time
         }
     
-    except Exception as e:
-        print(f"\nPlanner Error: {e}")
-        raise
\ No newline at end of file
+    return {"tasks": follow_ups}
+
+
+async def refine_follow_up_queries(query: str, follow_ups: list[ResearchTask]) -> list[ResearchTask]:
+    """Expand every follow-up's search queries in one LLM call"""
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", """You write web search queries for follow-up research tasks.
+
+For each task, write {per_task} diverse search queries that approach the task from different angles.
+Keep queries specific and targeted. Return an entry for every task_id you are given."""),
+        
+        ("human", """Original Query: {query}
+
+Follow-up Tasks:
+{task_list}""")
+    ])
+    
+    result: FollowUpQueries = await run_structured("query_expansion", prompt, {
+        "query": query,
+        "per_task": FOLLOW_UP_QUERIES_PER_TASK,
+        "task_list": "\n".join(f"- {t['task_id']}: {t['description']}" for t in follow_ups)
+    })
+    
+    expanded = {e.task_id: e.search_queries for e in result.expansions if e.search_queries}
+    for task in follow_ups:
+        queries = expanded.get(task["task_id"])
+        if queries:
+            task["search_queries"] = queries[:FOLLOW_UP_QUERIES_PER_TASK]
+            print(f"  Task {task['task_id']}: {task['search_queries']}")
+    return follow_ups
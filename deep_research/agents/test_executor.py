@@ -15,6 +15,7 @@ async def main():
         "full_context": "",
         "final_output": {},
         "total_tokens_used": 0,
+        "search_calls_used": 0,
         "execution_time": 0.0
     }
 
@@ -1,24 +1,65 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from typing import Dict, Any
+from typing import Dict, Any, List
+import asyncio
 
-from deep_research.config import NEBIUS_API_KEY
-from deep_research.output_schemas import FinalReport
-from deep_research.state import ResearchState
+from deep_research.context import context_header, render_task_result
+from deep_research import config
+from deep_research.config import (
+    REPORT_MAX_CITATIONS,
+    WRITER_MAP_CONCURRENCY,
+    WRITER_MAP_REDUCE_TOKENS,
+    WRITER_MODE,
+    WRITER_SECTION_TOKENS
+)
+from deep_research.events import emit
+from deep_research.llm import run_structured, stream_structured
+from deep_research.output_schemas import FinalReport, SectionDraft
+from deep_research.state import ResearchState, TaskResult
+from deep_research.tools.dedup import merge_citations
+from deep_research.tools.utils import count_tokens
 
 
 async def writer_node(state: ResearchState) -> Dict[str, Any]:
     print("WRITER: Generating final research report...")
     
-    llm = ChatOpenAI(
-        model="meta-llama/Llama-3.3-70B-Instruct",
-        temperature=0.3,
-        api_key=NEBIUS_API_KEY,
-        base_url="https://api.studio.nebius.ai/v1/"
-    )
-    
-    structured_llm = llm.with_structured_output(FinalReport)
+    try:
+        if use_map_reduce(state):
+            report = await write_map_reduce(state)
+        else:
+            report = await write_report(state, state["full_context"])
+        
+        # Keep the sources the writer and the tasks relied on, deduplicated and best first
+        report.all_citations = merge_citations(
+            list(report.all_citations) + [url for result in state["task_results"] for url in result["citations"]],
+            # Ranked on stored URLs, scores and SimHashes, so no page text is loaded
+            (r for result in state["task_results"] for r in result["search_results"]),
+            limit=REPORT_MAX_CITATIONS
+        )
+        
+        print("Final report generated!")
+        print(f"  Executive Summary: {report.executive_summary[:150]}...")
+        print(f"  Key Insights: {len(report.key_insights)} insights")
+        print(f"  Citations: {len(report.all_citations)} sources")
+        print(f"  Confidence: {report.confidence_score:.2f}")
+        
+        return {
+            "final_output": report.model_dump(),
+            "research_complete": True
+        }
     
+    except Exception as e:
+        print(f" Writer error: {e}")
+        raise
+
+
+def use_map_reduce(state: ResearchState) -> bool:
+    if WRITER_MODE == "auto":
+        return count_tokens(state["full_context"]) > WRITER_MAP_REDUCE_TOKENS
+    return WRITER_MODE == "map_reduce"
+
+
+async def write_report(state: ResearchState, full_context: str) -> FinalReport:
+    """Single structured call producing the FinalReport from `full_context`"""
     prompt = ChatPromptTemplate.from_messages([
         ("system", """You are an expert research writer. Create a comprehensive, well-structured final report.
 
@@ -42,26 +83,111 @@ Total Iterations: {iterations}
 Generate a comprehensive final report that thoroughly answers the query.""")
     ])
     
-    chain = prompt | structured_llm
-    
+    inputs = {
+        "query": state["query"],
+        "full_context": full_context,
+        "iterations": state.get("iteration_count", 0) + 1
+    }
+    # Read per call: the server turns streaming on after this module may have been imported
+    if config.WRITER_STREAM:
+        return await stream_report(prompt, inputs)
+    return await run_structured("writer", prompt, inputs)
+
+
+async def stream_report(prompt: ChatPromptTemplate, inputs: Dict[str, Any]) -> FinalReport:
+    """Generate the report as a stream, emitting executive summary text as it arrives"""
+    final: Dict[str, Any] = {}
+    sent = 0
     try:
-        report: FinalReport = await chain.ainvoke({
-            "query": state["query"],
-            "full_context": state["full_context"],
-            "iterations": state.get("iteration_count", 0) + 1
-        })
-        
-        print("Final report generated!")
-        print(f"  Executive Summary: {report.executive_summary[:150]}...")
-        print(f"  Key Insights: {len(report.key_insights)} insights")
-        print(f"  Citations: {len(report.all_citations)} sources")
-        print(f"  Confidence: {report.confidence_score:.2f}")
+        async for partial in stream_structured("writer", prompt, inputs):
+            final = partial
+            summary = partial.get("executive_summary") or ""
+            if len(summary) > sent:
+                emit("report_delta", text=summary[sent:])
+                sent = len(summary)
+        return FinalReport.model_validate(final)
+    except Exception as e:
+        if sent:
+            raise
+        # Nothing shown yet, so the regular (retried) call is a safe fallback
+        print(f"Report streaming failed, falling back to a full writer call: {e}")
+        return await run_structured("writer", prompt, inputs)
+
+
+async def write_map_reduce(state: ResearchState) -> FinalReport:
+    """
+    Draft sections of the task results concurrently, then merge them
+
+    Each section covers consecutive tasks up to WRITER_SECTION_TOKENS of
+    context; at most WRITER_MAP_CONCURRENCY drafts are generated at once.
+    The reduce step is the regular report call over the drafts, which are
+    far shorter than the full context.
+    """
+    sections = group_sections(state["task_results"])
+    print(f"  Context too large for one pass, drafting {len(sections)} sections...")
+    
+    semaphore = asyncio.Semaphore(WRITER_MAP_CONCURRENCY)
+    
+    async def draft(section: List[TaskResult]) -> SectionDraft:
+        async with semaphore:
+            return await draft_section(state, section)
+    
+    drafts = await asyncio.gather(*[draft(section) for section in sections], return_exceptions=True)
+    
+    rendered = []
+    for section, result in zip(sections, drafts):
+        if isinstance(result, Exception):
+            # Fall back to the raw context for this section rather than dropping it
+            print(f"  Section draft failed ({result}), using its raw context")
+            rendered.extend(render_task_result(r) for r in section)
+        else:
+            rendered.append(render_section(result))
+    
+    return await write_report(state, "\n".join([context_header(state)] + rendered))
+
+
+def group_sections(task_results: List[TaskResult]) -> List[List[TaskResult]]:
+    """Pack consecutive task results into sections of at most WRITER_SECTION_TOKENS"""
+    sections: List[List[TaskResult]] = []
+    current: List[TaskResult] = []
+    used = 0
+    for result in task_results:
+        tokens = count_tokens(render_task_result(result))
+        if current and used + tokens > WRITER_SECTION_TOKENS:
+            sections.append(current)
+            current, used = [], 0
+        current.append(result)
+        used += tokens
+    if current:
+        sections.append(current)
+    return sections
+
+
+async def draft_section(state: ResearchState, section: List[TaskResult]) -> SectionDraft:
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", """You are a research writer drafting one section of a larger report. Another writer will merge every section into the final report.
+
+Cover only the research given to you. Keep concrete facts, figures, dates and names; drop repetition. Cite the URLs that support the section."""),
         
-        return {
-            "final_output": report.model_dump(),
-            "research_complete": True
-        }
+        ("human", """Original Query: {query}
+
+Section Research:
+{section_context}
+
+Draft this section now.""")
+    ])
     
-    except Exception as e:
-        print(f" Writer error: {e}")
-        raise
\ No newline at end of file
+    return await run_structured("section_writer", prompt, {
+        "query": state["query"],
+        "section_context": "\n".join(render_task_result(r) for r in section)
+    })
+
+
+def render_section(draft: SectionDraft) -> str:
+    parts = []
+    parts.append(f"\n### {draft.title}\n")
+    parts.append(f"**Findings**: {draft.findings}\n")
+    parts.append(f"**Key Insights**: {draft.key_insights}\n")
+    parts.append(f"**Citations**: {draft.citations}\n")
+    parts.append(f"**Confidence**: {draft.confidence:.2f}\n")
+    return "\n".join(parts)
@@ -0,0 +1,205 @@
+"""
+End-to-end benchmark for the research graph
+
+Runs a fixed corpus of queries through the compiled graph against simulated
+or replayed backends, N queries at a time, and writes a JSON report with
+p50/p95/p99 latency per node, task, search, extraction and LLM call, plus
+achieved concurrency, token totals and throughput.
+
+    python -m deep_research.benchmark --concurrency 4 --llm-latency 1.5 --output bench.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from deep_research import config, telemetry
+
+
+DEFAULT_QUERIES = [
+    "Why did Silicon Valley Bank collapse in March 2023 and what regulations were proposed since?",
+    "What are the key differences between Rust and Go for systems programming?",
+    "How do solid-state batteries compare to lithium-ion for electric vehicles?",
+    "What caused the 2021 global semiconductor shortage and how did it end?",
+    "How effective are carbon capture technologies at industrial scale today?",
+    "What is the current evidence on intermittent fasting and longevity?",
+    "How do central bank digital currencies differ across China, the EU and the US?",
+    "What are the main approaches to aligning large language models and their trade-offs?",
+]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the research graph")
+    parser.add_argument("--queries", help="JSONL file of {\"query\": ...} objects (default: built-in corpus)")
+    parser.add_argument("--mode", choices=["simulate", "replay"], default="simulate",
+                        help="Backend for Tavily and LLM calls")
+    parser.add_argument("--cassette", help="Cassette to replay from")
+    parser.add_argument("--concurrency", type=int, default=1, help="Queries in flight at once")
+    parser.add_argument("--repeat", type=int, default=1, help="Times to run the corpus")
+    parser.add_argument("--max-iterations", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Injected seconds per LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Injected seconds per search")
+    parser.add_argument("--extract-latency", type=float, default=0.0, help="Injected seconds per extract call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Injected failure rate for every provider")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the search/extract cache")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON report")
+    parser.add_argument("--metrics", help="Also write Prometheus-format metrics to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show agent output")
+    return parser.parse_args(argv)
+
+
+def load_queries(path: Optional[str]) -> List[str]:
+    if not path:
+        return list(DEFAULT_QUERIES)
+    with open(path) as f:
+        return [json.loads(line)["query"] for line in f if line.strip()]
+
+
+def configure(args: argparse.Namespace) -> None:
+    """Point the pipeline at the benchmark backends; must run before the graph is imported"""
+    config.REPLAY_MODE = args.mode
+    if args.cassette:
+        config.REPLAY_CASSETTE = args.cassette
+    if args.mode == "replay":
+        config.REPLAY_ON_MISS = "simulate"
+    config.REPLAY_LATENCY = {
+        "tavily_search": args.search_latency,
+        "tavily_extract": args.extract_latency,
+        "llm": args.llm_latency,
+    }
+    config.REPLAY_ERROR_RATE = {provider: args.error_rate for provider in config.REPLAY_LATENCY}
+    if args.no_cache:
+        config.CACHE_BACKEND = "none"
+    config.TELEMETRY_ENABLED = True
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run_benchmark(
+    queries: List[str],
+    concurrency: int = 1,
+    max_iterations: int = 2,
+    verbose: bool = False
+) -> Dict[str, Any]:
+    from deep_research.agents.executor import retry_stats
+    from deep_research.graph import create_research_graph
+    from deep_research.limits import limiter_stats
+    from deep_research.resilience import resilience_stats
+    from deep_research.state import new_research_state
+    from deep_research.tools.blobs import blob_scope, blob_stats
+    from deep_research.tools.cache import cache_stats
+    from deep_research.tools.search import coalescing_stats
+    from deep_research.tools.search_policy import search_policy_stats
+    from deep_research.tools.task_cache import task_cache_stats
+
+    app = create_research_graph()
+    telemetry.reset()
+    semaphore = asyncio.Semaphore(concurrency)
+    runs: List[Dict[str, Any]] = []
+
+    async def run_one(query: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            record: Dict[str, Any] = {"query": query}
+            try:
+                with blob_scope():
+                    final_state = await app.ainvoke(new_research_state(query, max_iterations))
+                record.update({
+                    "ok": True,
+                    "iterations": final_state.get("iteration_count", 0) + 1,
+                    "tasks": len(final_state.get("task_results", [])),
+                    "tokens": final_state.get("total_tokens_used", 0),
+                    "search_calls": final_state.get("search_calls_used", 0),
+                })
+            except Exception as e:
+                record.update({"ok": False, "error": repr(e)})
+            record["wall_time"] = time.perf_counter() - start
+            runs.append(record)
+
+    output = sys.stdout if verbose else io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        await asyncio.gather(*[run_one(query) for query in queries])
+    wall_time = time.perf_counter() - start
+
+    completed = [r for r in runs if r["ok"]]
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {
+            "mode": config.REPLAY_MODE,
+            "queries": len(queries),
+            "concurrency": concurrency,
+            "max_iterations": max_iterations,
+            "latency": config.REPLAY_LATENCY,
+            "error_rate": config.REPLAY_ERROR_RATE,
+            "cache_backend": config.CACHE_BACKEND,
+            "executor_mode": config.EXECUTOR_MODE,
+            "planner_mode": config.PLANNER_MODE,
+            "follow_up_mode": config.FOLLOW_UP_MODE,
+        },
+        "wall_time": wall_time,
+        "throughput_qps": len(completed) / wall_time if wall_time else 0.0,
+        "succeeded": len(completed),
+        "failed": len(runs) - len(completed),
+        "total_tokens": sum(r.get("tokens", 0) for r in completed),
+        "run_wall_time": telemetry.summarize([r["wall_time"] for r in completed]),
+        "latency": telemetry.latency_report(wall_time),
+        "limiters": limiter_stats(),
+        "resilience": resilience_stats(),
+        "caches": cache_stats(),
+        "coalescing": coalescing_stats(),
+        "search_policy": search_policy_stats(),
+        "blobs": blob_stats(),
+        "task_cache": task_cache_stats(),
+        "executor_retries": retry_stats.as_dict(),
+        "runs": runs,
+    }
+
+
+def print_summary(report: Dict[str, Any]) -> None:
+    print(f"{report['succeeded']} succeeded, {report['failed']} failed in {report['wall_time']:.2f}s "
+          f"({report['throughput_qps']:.2f} queries/s, {report['total_tokens']} tokens)")
+    print(f"{'span':<24}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'peak':>6}{'conc':>7}")
+    for name, s in report["latency"].items():
+        print(f"{name:<24}{s['count']:>7}{s['p50']:>9.3f}{s['p95']:>9.3f}{s['p99']:>9.3f}"
+              f"{s['max_in_flight']:>6}{s.get('mean_concurrency', 0):>7.2f}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    configure(args)
+    queries = load_queries(args.queries) * args.repeat
+
+    report = asyncio.run(run_benchmark(
+        queries,
+        concurrency=args.concurrency,
+        max_iterations=args.max_iterations,
+        verbose=args.verbose
+    ))
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print_summary(report)
+    print(f"Report written to {args.output}")
+    if args.metrics:
+        with open(args.metrics, "w") as f:
+            f.write(telemetry.render_prometheus())
+        print(f"Metrics written to {args.metrics}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Durable checkpoints and resume for research runs
+
+The compiled graph checkpoints its state after every node into SQLite,
+keyed by thread id, so re-running a failed thread continues from the last
+completed node (a writer failure reuses the observer's context instead of
+searching again). Inside the executor node, every finished task is also
+journaled, so a run that dies mid-pass only re-executes the tasks that had
+not finished.
+
+Snapshots stay small because page text lives in the blob store and the
+state only holds references.
+"""
+import hashlib
+import json
+import os
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+
+from deep_research import config
+from deep_research.state import ResearchState, ResearchTask, TaskResult, new_research_state
+from deep_research.tools.blobs import blob_scope
+from deep_research.tools.cache import CacheBackend, SQLiteCache
+
+_thread_id: ContextVar[Optional[str]] = ContextVar("deep_research_thread", default=None)
+_journal: Optional[CacheBackend] = None
+
+
+@asynccontextmanager
+async def open_checkpointer(path: Optional[str] = None) -> AsyncIterator[Any]:
+    """
+    SQLite checkpointer for create_research_graph, or None if disabled
+
+    Requires the langgraph-checkpoint-sqlite package.
+    """
+    path = config.CHECKPOINT_PATH if path is None else path
+    if not path:
+        yield None
+        return
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(path) as saver:
+        yield saver
+
+
+def thread_config(thread_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+async def run_research(
+    app: Any,
+    query: str,
+    thread_id: str,
+    max_iterations: int = 2
+) -> ResearchState:
+    """
+    Run `query` on `thread_id`, resuming the thread if it was interrupted
+
+    A thread whose last run failed continues from its next pending node; a
+    finished thread returns its stored final state without running again.
+    The run's blobs are released when it completes and kept on disk for the
+    resume when it fails.
+    """
+    run_config = thread_config(thread_id)
+    snapshot = await app.aget_state(run_config)
+    if snapshot.values.get("final_output") and not snapshot.next:
+        print(f"Thread {thread_id} already completed")
+        return snapshot.values
+    with blob_scope(keep_on_error=True):
+        if snapshot.next:
+            print(f"Resuming thread {thread_id} at {', '.join(snapshot.next)}")
+            return await app.ainvoke(None, run_config)
+        return await app.ainvoke(new_research_state(query, max_iterations), run_config)
+
+
+@contextmanager
+def bound_thread(run_config: Optional[Dict[str, Any]]) -> Iterator[Optional[str]]:
+    """Make the run's thread id visible to task journaling for the enclosed block"""
+    thread_id = ((run_config or {}).get("configurable") or {}).get("thread_id")
+    token = _thread_id.set(str(thread_id) if thread_id is not None else None)
+    try:
+        yield thread_id
+    finally:
+        _thread_id.reset(token)
+
+
+def get_journal() -> CacheBackend:
+    global _journal
+    if _journal is None:
+        _journal = SQLiteCache(config.CHECKPOINT_PATH, table="task_journal")
+    return _journal
+
+
+def journal_key(thread_id: str, task: ResearchTask, state: ResearchState) -> str:
+    """Task ids repeat across re-plans, so the key also covers the iteration and task content"""
+    content = json.dumps([task['description'], task['search_queries']], sort_keys=True)
+    digest = hashlib.sha256(content.encode()).hexdigest()[:16]
+    return f"{thread_id}|{state.get('iteration_count', 0)}|{task['task_id']}|{digest}"
+
+
+async def journaled_task(
+    task: ResearchTask,
+    state: ResearchState,
+    run: Callable[[], Awaitable[TaskResult]]
+) -> TaskResult:
+    """
+    Return the journaled result for this task on this thread, or run it
+
+    Only clean results are journaled; a task that hit errors runs again on
+    resume. Without a thread id or checkpoint path this just runs the task.
+    """
+    thread_id = _thread_id.get()
+    if thread_id is None or not config.CHECKPOINT_PATH:
+        return await run()
+
+    key = journal_key(thread_id, task, state)
+    stored = get_journal().get(key)
+    if stored is not None:
+        print(f"Task {task['task_id']} restored from checkpoint")
+        return stored
+
+    result = await run()
+    if not result.get("errors"):
+        get_journal().set(key, result, config.CHECKPOINT_TASK_TTL)
+    return result
@@ -1,14 +1,209 @@
 import os
+
 from dotenv import load_dotenv
 
+# .env is loaded before any setting is read, so DEEP_RESEARCH_* values in it
+# take effect like the API keys do
 load_dotenv()
 
-# API Keys
-NEBIUS_API_KEY = os.getenv("NEBIUS_API_KEY")
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
-LANGCHAIN_TRACING_V2 = os.getenv("LANGCHAIN_TRACING_V2", "false")
-LANGCHAIN_PROJECT = os.getenv("LANGCHAIN_PROJECT", "deep-research")
+# API keys and tracing settings are looked up in the environment on each
+# access (module __getattr__ below) rather than copied into module globals
+_ENV_SETTINGS = {
+    "NEBIUS_API_KEY": None,
+    "TAVILY_API_KEY": None,
+    "LANGCHAIN_TRACING_V2": "false",
+    "LANGCHAIN_PROJECT": "deep-research",
+}
+
+
+def __getattr__(name: str):
+    if name in _ENV_SETTINGS:
+        return os.getenv(name, _ENV_SETTINGS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Search configs
 MAX_SEARCH_RESULTS = 5
 SEARCH_TIMEOUT = 30
+
+# Adaptive search depth: each task query starts with a basic search for
+# SEARCH_INITIAL_RESULTS results and is re-run as an advanced search for
+# MAX_SEARCH_RESULTS results, page content included, when the best score or
+# the share of query terms the results cover is below its threshold. The
+# thresholds start at the minimums below and follow the
+# SEARCH_ESCALATION_QUANTILE of recently recorded searches, up or down
+# within the bounds, once there are SEARCH_STATS_MIN_SAMPLES of them
+# (see tools/search_policy.py)
+SEARCH_ADAPTIVE = os.getenv("DEEP_RESEARCH_ADAPTIVE_SEARCH", "true").lower() == "true"
+SEARCH_INITIAL_RESULTS = 3
+SEARCH_MIN_SCORE = 0.5
+SEARCH_MIN_COVERAGE = 0.6
+SEARCH_SCORE_BOUNDS = (0.2, 0.8)
+SEARCH_COVERAGE_BOUNDS = (0.3, 0.9)
+SEARCH_ESCALATION_QUANTILE = 0.2
+SEARCH_STATS_WINDOW = 500
+SEARCH_STATS_MIN_SAMPLES = 20
+SEARCH_STATS_TTL = 30 * 24 * 60 * 60
+# Search requests a research run may send to Tavily (escalations included,
+# cached and coalesced searches are free), 0 for no limit
+SEARCH_BUDGET = int(os.getenv("DEEP_RESEARCH_SEARCH_BUDGET", "0"))
+
+# LLM configs
+NEBIUS_BASE_URL = "https://api.studio.nebius.ai/v1/"
+DEFAULT_MODEL = "meta-llama/Llama-3.3-70B-Instruct"
+
+# Shared keep-alive HTTP pool used by every LLM client
+LLM_POOL_SIZE = 20
+LLM_KEEPALIVE_EXPIRY = 30.0
+
+# Per-role overrides. Any role may set its own "pool_size" to get a
+# dedicated connection pool instead of the shared one.
+SMALL_MODEL = os.getenv("DEEP_RESEARCH_SMALL_MODEL", "meta-llama/Meta-Llama-3.1-8B-Instruct")
+# Settings per role, or per "<role>.<call_type>" to route one kind of call
+# differently. Cheap classification-style calls go to the small model; a
+# "fallback_model" is retried when the output fails schema validation
+LLM_ROLES = {
+    "planner": {"model": DEFAULT_MODEL, "temperature": 0},
+    "executor": {"model": DEFAULT_MODEL, "temperature": 0},
+    "observer": {"model": SMALL_MODEL, "temperature": 0, "fallback_model": DEFAULT_MODEL},
+    "writer": {"model": DEFAULT_MODEL, "temperature": 0.3},
+    "section_writer": {"model": DEFAULT_MODEL, "temperature": 0.3},
+    "query_expansion": {"model": SMALL_MODEL, "temperature": 0.3, "fallback_model": DEFAULT_MODEL},
+}
+
+# Search/extraction cache
+CACHE_BACKEND = os.getenv("DEEP_RESEARCH_CACHE", "memory")  # "memory", "sqlite", "tiered" or "none"
+CACHE_PATH = os.getenv("DEEP_RESEARCH_CACHE_PATH", ".cache/deep_research.sqlite")
+CACHE_MAX_ENTRIES = 2048
+SEARCH_CACHE_TTL = 6 * 60 * 60
+EXTRACT_CACHE_TTL = 24 * 60 * 60
+
+# Extraction batching: URLs requested within the window go out in one call
+EXTRACT_BATCH_WINDOW = 0.05
+EXTRACT_BATCH_SIZE = 20
+
+# Per-provider limits applied at the tool/LLM boundary: "concurrency" caps
+# in-flight calls, "rate" (calls/sec) and "burst" size the token bucket
+PROVIDER_LIMITS = {
+    "tavily_search": {"concurrency": 8, "rate": 5.0, "burst": 10},
+    "tavily_extract": {"concurrency": 4, "rate": 2.0, "burst": 4},
+    "llm": {"concurrency": 8, "rate": 4.0, "burst": 8},
+}
+
+# Resilience per provider: per-attempt deadline (seconds), attempts, and an
+# optional hedge delay after which a duplicate request races the slow one
+RESILIENCE = {
+    "tavily_search": {"timeout": SEARCH_TIMEOUT, "attempts": 3, "hedge_after": 8.0},
+    "tavily_extract": {"timeout": SEARCH_TIMEOUT, "attempts": 2, "hedge_after": None},
+    "llm": {"timeout": 120, "attempts": 3, "hedge_after": None},
+}
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30.0
+
+# Executor mode: "batch" waits for every task before observing; "streaming"
+# feeds results to the observer as they finish and starts follow-ups early
+EXECUTOR_MODE = os.getenv("DEEP_RESEARCH_EXECUTOR_MODE", "batch")
+# Fraction of first-wave tasks that must finish before early gap analysis
+STREAM_EARLY_EVAL_FRACTION = 0.5
+
+# How observer follow-ups reach the executor: "direct" runs them as built,
+# "refine" expands each one's search queries in a single LLM call, and
+# "replan" sends them back through the full planner
+FOLLOW_UP_MODE = os.getenv("DEEP_RESEARCH_FOLLOW_UP_MODE", "direct")
+FOLLOW_UP_QUERIES_PER_TASK = 3
+
+# Planner mode: "batch" waits for the full plan; "streaming" starts each task
+# as soon as the model has finished writing it
+PLANNER_MODE = os.getenv("DEEP_RESEARCH_PLANNER_MODE", "batch")
+
+# Context assembly: token budget for the task results each consumer sees.
+# Results are ranked by relevance to the consumer's focus and by recency
+# (weight below); low-ranked ones are shortened or dropped to fit
+CONTEXT_BUDGETS = {"writer": 24000, "observer": 4000, "executor": 1500}
+# tiktoken encoding budgets are counted with. cl100k_base is the base of the
+# Llama 3 vocabulary, so its counts track the configured models closely.
+# When it cannot be loaded (no tiktoken, or offline on first use) or is set
+# to "", tokens are estimated at ~4 characters each, which undercounts
+# code and non-English text
+TOKENIZER_ENCODING = os.getenv("DEEP_RESEARCH_TOKENIZER", "cl100k_base")
+CONTEXT_RECENCY_WEIGHT = 0.3
+CONTEXT_FRAGMENT_CACHE_SIZE = 4096
+
+# Writer mode: "single" sends the whole context to one call; "map_reduce"
+# drafts sections of at most WRITER_SECTION_TOKENS concurrently and merges
+# them; "auto" uses map_reduce once the context exceeds WRITER_MAP_REDUCE_TOKENS
+WRITER_MODE = os.getenv("DEEP_RESEARCH_WRITER_MODE", "auto")
+WRITER_MAP_REDUCE_TOKENS = 12000
+WRITER_SECTION_TOKENS = 6000
+WRITER_MAP_CONCURRENCY = 4
+# Sources listed in the final report, taken from what the writer and the tasks cited
+REPORT_MAX_CITATIONS = 20
+# Stream the final report and emit its text as it is generated (the server turns this on)
+WRITER_STREAM = os.getenv("DEEP_RESEARCH_WRITER_STREAM", "false").lower() == "true"
+
+# HTTP server (python -m deep_research.main serve): research jobs running at
+# once, and jobs allowed to wait for a slot before requests are rejected
+SERVER_HOST = os.getenv("DEEP_RESEARCH_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("DEEP_RESEARCH_PORT", "8000"))
+SERVER_MAX_JOBS = 4
+SERVER_QUEUE_SIZE = 16
+
+# Snippet sufficiency: schema fields below this confidence are re-researched
+# from full page content, extracting at most this many URLs per task
+SUFFICIENCY_CONFIDENCE_THRESHOLD = 0.5
+MAX_RETRY_EXTRACTIONS = 3
+
+# Search result dedup: results whose content SimHashes differ in at most this
+# many bits are the same page; shorter contents are only deduped by URL
+DEDUP_SIMHASH_DISTANCE = 3
+DEDUP_MIN_TOKENS = 12
+
+# Durable checkpoints: graph state per thread id plus a journal of finished
+# tasks, so a failed run resumes where it stopped ("" disables)
+CHECKPOINT_PATH = os.getenv("DEEP_RESEARCH_CHECKPOINT", ".cache/checkpoints.sqlite")
+CHECKPOINT_TASK_TTL = 7 * 24 * 3600
+
+# Cross-run task cache: a new task reuses a stored TaskResult when its
+# description, queries and schema fields are at least this similar (Jaccard)
+# to a task completed within the freshness window
+TASK_CACHE_ENABLED = os.getenv("DEEP_RESEARCH_TASK_CACHE", "false").lower() == "true"
+TASK_CACHE_PATH = os.getenv("DEEP_RESEARCH_TASK_CACHE_PATH", ".cache/task_cache.sqlite")
+TASK_CACHE_SIMILARITY = 0.7
+TASK_CACHE_TTL = 24 * 3600
+TASK_CACHE_MAX_ENTRIES = 10000
+
+# Content store for page text referenced from the graph state: blobs beyond
+# the memory limit spill to BLOB_SPILL_DIR (None keeps everything in memory).
+# A run's blobs are released when it finishes; spilled files are also evicted
+# oldest first beyond BLOB_DISK_LIMIT bytes, and after BLOB_DISK_TTL seconds
+BLOB_MEMORY_LIMIT = 64 * 1024 * 1024
+BLOB_SPILL_DIR = os.getenv("DEEP_RESEARCH_BLOB_DIR", ".cache/blobs") or None
+BLOB_DISK_LIMIT = 1024 * 1024 * 1024
+BLOB_DISK_TTL = 7 * 24 * 3600
+
+# Passage selection: results are chunked into passages of about this many
+# characters, ranked with BM25 against the task, and packed into a token budget
+PASSAGE_CHARS = 600
+SNIPPET_TOKEN_BUDGET = 2500
+RETRY_TOKEN_BUDGET = 4000
+
+# Record/replay of Tavily and LLM calls: "off", "record" (live calls saved to
+# the cassette), "replay" (served from the cassette) or "simulate" (local
+# stand-ins, no network or API keys needed)
+REPLAY_MODE = os.getenv("DEEP_RESEARCH_REPLAY", "off")
+REPLAY_CASSETTE = os.getenv("DEEP_RESEARCH_CASSETTE", "cassettes/default.json")
+# What a replay does on a cassette miss: "error" or "simulate"
+REPLAY_ON_MISS = "error"
+# Injected per-call latency (seconds, mean with +/- jitter fraction) and error
+# rate when replaying or simulating
+REPLAY_LATENCY = {"tavily_search": 0.0, "tavily_extract": 0.0, "llm": 0.0}
+REPLAY_LATENCY_JITTER = 0.25
+REPLAY_ERROR_RATE = {"tavily_search": 0.0, "tavily_extract": 0.0, "llm": 0.0}
+REPLAY_SEED = 0
+
+# Tracing spans and metrics (token totals in the state are always kept)
+TELEMETRY_ENABLED = os.getenv("DEEP_RESEARCH_TELEMETRY", "false").lower() == "true"
+TELEMETRY_MAX_SPANS = 5000
+TELEMETRY_MAX_SAMPLES = 10000  # latency samples kept per span name for percentiles
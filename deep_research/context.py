@@ -0,0 +1,169 @@
+"""
+Token-budgeted context assembly
+
+One builder serves every consumer of task results: the observer's gap
+analysis, the writer's report context and the "other completed research"
+each executor prompt includes. Each consumer has a token budget
+(CONTEXT_BUDGETS). Results are ranked by BM25 relevance to the consumer's
+focus blended with recency, then given the most detailed rendering that
+still fits:
+
+- full: reasoning, findings and citations
+- brief: findings and key insights
+- summary: one line of key insights
+
+Results that do not fit even as a summary are dropped and counted in a
+closing note. Rendered fragments are cached, so repeated passes over a
+growing task list only render the new results.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from deep_research.config import (
+    CONTEXT_BUDGETS,
+    CONTEXT_FRAGMENT_CACHE_SIZE,
+    CONTEXT_RECENCY_WEIGHT
+)
+from deep_research.state import ResearchState, TaskResult
+from deep_research.tools.passages import bm25_scores, tokenize
+from deep_research.tools.utils import count_tokens
+
+LEVELS = ("full", "brief", "summary")
+
+_fragments: "OrderedDict[Tuple, Tuple[str, int]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def context_header(state: ResearchState) -> str:
+    parts = []
+    parts.append(f"## Original Query\n{state['query']}\n")
+    parts.append(f"## Research Plan\n{state['research_plan']}\n")
+    parts.append("## Task Execution Results\n")
+    return "\n".join(parts)
+
+
+def render_task_result(result: TaskResult, level: str = "full") -> str:
+    if level == "summary":
+        insights = "; ".join(result.get('key_insights') or []) or str(result['structured_output'])
+        return f"- Task {result['task_id']}: {insights}"
+
+    parts = []
+    parts.append(f"\n### Task {result['task_id']}\n")
+    if level == "full":
+        parts.append(f"**Reasoning**: {result['reasoning']}\n")
+    parts.append(f"**Findings**: {result['structured_output']}\n")
+    if level == "full":
+        parts.append(f"**Citations**: {result['citations']}\n")
+    else:
+        parts.append(f"**Key Insights**: {result.get('key_insights', [])}\n")
+    return "\n".join(parts)
+
+
+def fragment(result: TaskResult, level: str) -> Tuple[str, int]:
+    """Rendered text and token estimate of one result at one level, cached"""
+    # Keyed on everything that is rendered: task ids repeat across runs, and
+    # the cache is shared by every run in the process
+    key = (
+        level,
+        result['task_id'],
+        result['reasoning'],
+        str(result['structured_output']),
+        tuple(result['citations']),
+        tuple(result.get('key_insights') or ()),
+    )
+    with _lock:
+        cached = _fragments.get(key)
+        if cached is not None:
+            _fragments.move_to_end(key)
+            return cached
+
+    text = render_task_result(result, level)
+    entry = (text, count_tokens(text))
+    with _lock:
+        _fragments[key] = entry
+        while len(_fragments) > CONTEXT_FRAGMENT_CACHE_SIZE:
+            _fragments.popitem(last=False)
+    return entry
+
+
+def rank_results(results: Sequence[TaskResult], focus: str) -> List[int]:
+    """Indices of `results`, most relevant and most recent first"""
+    if not results:
+        return []
+    scores = bm25_scores(tokenize(focus), [tokenize(fragment(r, "brief")[0]) for r in results])
+    top = max(scores) or 1.0
+    n = len(results)
+    priority = [
+        (1 - CONTEXT_RECENCY_WEIGHT) * scores[i] / top
+        + CONTEXT_RECENCY_WEIGHT * (i + 1) / n  # task_results is in completion order
+        for i in range(n)
+    ]
+    return sorted(range(n), key=lambda i: (-priority[i], -i))
+
+
+def build_context(
+    results: Sequence[TaskResult],
+    consumer: str,
+    focus: str,
+    budget: Optional[int] = None,
+    levels: Sequence[str] = LEVELS
+) -> str:
+    """
+    Render `results` within the consumer's token budget
+
+    `levels` lists the renderings this consumer may use, most detailed
+    first. Output keeps the original result order.
+    """
+    budget = CONTEXT_BUDGETS[consumer] if budget is None else budget
+    order = rank_results(results, focus)
+    cheapest = levels[-1]
+
+    # Everyone starts at the cheapest rendering; the lowest-ranked are dropped if even that overflows
+    chosen: Dict[int, str] = {}
+    used = 0
+    for i in order:
+        cost = fragment(results[i], cheapest)[1]
+        if used + cost <= budget:
+            chosen[i] = cheapest
+            used += cost
+
+    # Then upgrade by rank to the most detailed rendering that still fits
+    for i in order:
+        if i not in chosen:
+            continue
+        current = fragment(results[i], chosen[i])[1]
+        for level in levels[:-1]:
+            cost = fragment(results[i], level)[1]
+            if used - current + cost <= budget:
+                chosen[i] = level
+                used += cost - current
+                break
+
+    parts = [fragment(results[i], chosen[i])[0] for i in sorted(chosen)]
+    dropped = len(results) - len(chosen)
+    if dropped:
+        parts.append(f"\n({dropped} less relevant earlier task(s) omitted)")
+    return "\n".join(parts)
+
+
+def build_full_context(state: ResearchState) -> str:
+    """Header plus every task result, within the writer's budget"""
+    return "\n".join([
+        context_header(state),
+        build_context(state["task_results"], "writer", state["query"])
+    ])
+
+
+def research_summary(query: str, task_results: Sequence[TaskResult]) -> str:
+    """The observer's view of the research so far"""
+    return build_context(task_results, "observer", query, levels=("brief", "summary"))
+
+
+def other_task_context(state: ResearchState, task: Dict) -> str:
+    """Findings of the other completed tasks most relevant to `task`"""
+    others = [r for r in state.get("task_results", []) if r['task_id'] != task['task_id']]
+    if not others:
+        return ""
+    focus = " ".join([task['description'], *task.get('search_queries', [])])
+    return build_context(others, "executor", focus, levels=("brief", "summary"))
@@ -0,0 +1,19 @@
+"""
+Progress events for streaming consumers
+
+Agents call `emit(event, **data)` at points a waiting user cares about (plan
+ready, task finished, report text arriving). Inside a graph run started
+with stream_mode "custom" the event reaches the stream; anywhere else it is
+dropped, so emitting is always safe.
+"""
+from typing import Any
+
+
+def emit(event: str, **data: Any) -> None:
+    from langgraph.config import get_stream_writer
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        # Not inside a graph run
+        return
+    writer({"event": event, **data})
@@ -1,40 +1,57 @@
+from typing import Any, Optional
+
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 
 from deep_research.agents.executor import task_executor_node
 from deep_research.agents.observer import observer_node
-from deep_research.agents.planner import planner_node
+from deep_research.agents.planner import follow_up_node, planner_node, streaming_planner_node
 from deep_research.agents.writer import writer_node
+from deep_research.checkpoint import bound_thread
+from deep_research.config import FOLLOW_UP_MODE, PLANNER_MODE
 from deep_research.state import ResearchState
+from deep_research.telemetry import metered_tokens, span
+from deep_research.tools.search_policy import metered_searches
+
 
 
 
 
+def create_research_graph(checkpointer: Optional[Any] = None):
+    """
+    Compile the research graph
 
-def create_research_graph():
+    With a checkpointer (see checkpoint.open_checkpointer), state is saved
+    after every node and runs must pass a thread id; checkpoint.run_research
+    resumes interrupted threads.
+    """
     workflow = StateGraph(ResearchState)
-    workflow.add_node("planner", planner_node)
-    workflow.add_node("executor", task_executor_node)
-    workflow.add_node("observer", observer_node)
-    workflow.add_node("writer", writer_node)
+    streaming_plan = PLANNER_MODE == "streaming"
+    workflow.add_node("planner", instrument_node("planner", streaming_planner_node if streaming_plan else planner_node))
+    workflow.add_node("executor", instrument_node("executor", task_executor_node))
+    workflow.add_node("observer", instrument_node("observer", observer_node))
+    workflow.add_node("writer", instrument_node("writer", writer_node))
+    workflow.add_node("follow_up", instrument_node("follow_up", follow_up_node))
 
     workflow.set_entry_point("planner")
-    workflow.add_edge("planner", "executor")
+    # The streaming planner runs its tasks itself as they are planned
+    workflow.add_edge("planner", "observer" if streaming_plan else "executor")
     workflow.add_edge("executor", "observer")
+    workflow.add_edge("follow_up", "executor")
 
     workflow.add_conditional_edges(
         "observer",
         should_continue_research,
         {
-            "continue": "planner",
+            # Observer follow-ups skip the planner unless a full re-plan is configured
+            "continue": "planner" if FOLLOW_UP_MODE == "replan" else "follow_up",
             "write": "writer" 
         }
     )
 
     workflow.add_edge("writer", END)
 
-    # memory = MemorySaver()
-    app = workflow.compile()
+    app = workflow.compile(checkpointer=checkpointer)
 
     return app
 
@@ -50,4 +67,26 @@ def should_continue_research(state: ResearchState) -> str:
         print(f"Observer identified gaps. Running {len(state['follow_up_tasks'])} follow-up tasks...")
         return "continue"
     
-    return "write"
\ No newline at end of file
+    return "write"
+
+
+def instrument_node(name: str, node):
+    """
+    Wrap a graph node in a node.<name> span, add the tokens its LLM calls
+    used to total_tokens_used and charge its searches to the run's
+    search_calls_used
+    """
+    async def run(state: ResearchState, config: RunnableConfig):
+        searches_before = state.get("search_calls_used", 0)
+        with bound_thread(config), metered_tokens() as meter, metered_searches(searches_before) as searches:
+            async with span(f"node.{name}", iteration=state.get("iteration_count", 0)) as current:
+                update = await node(state)
+                if current is not None:
+                    current.set_attribute("llm.total_tokens", meter.total)
+                    current.set_attribute("search.calls", searches.used - searches_before)
+        if meter.total:
+            update = {**(update or {}), "total_tokens_used": state.get("total_tokens_used", 0) + meter.total}
+        if searches.used != searches_before:
+            update = {**(update or {}), "search_calls_used": searches.used}
+        return update
+    return run
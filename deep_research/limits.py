@@ -0,0 +1,152 @@
+"""
+Concurrency and rate limits per upstream provider
+
+Each provider gets a semaphore capping in-flight calls and a token bucket
+smoothing the request rate, so executor fan-out queues locally instead of
+bursting into 429s. Time spent waiting is recorded per provider.
+"""
+import asyncio
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from deep_research import config
+from deep_research.telemetry import QUEUE_WAIT_SECONDS
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`; each call takes one"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _try_take(self) -> float:
+        """Take a token if available; otherwise return seconds until one is"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        while True:
+            delay = self._try_take()
+            if delay == 0.0:
+                return
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class LimiterStats:
+    acquired: int = 0
+    waiting: int = 0
+    in_flight: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        stats = asdict(self)
+        stats["mean_wait"] = self.total_wait / self.acquired if self.acquired else 0.0
+        return stats
+
+
+class ProviderLimiter:
+    """
+    Semaphore plus token bucket for one provider
+
+    Use as `async with limiter:` around the upstream call, or pass it to
+    call_with_resilience so queueing happens before its deadline starts.
+    """
+
+    def __init__(self, name: str, concurrency: int, rate: Optional[float] = None, burst: Optional[int] = None):
+        self.name = name
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, burst or concurrency) if rate else None
+        self.stats = LimiterStats()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores bind to one event loop; start fresh if the loop changed
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def acquire(self) -> None:
+        """Wait for a slot and a rate token"""
+        semaphore = self._get_semaphore()
+        start = time.monotonic()
+        self.stats.waiting += 1
+        try:
+            await semaphore.acquire()
+            if self.bucket is not None:
+                try:
+                    await self.bucket.acquire()
+                except BaseException:
+                    semaphore.release()
+                    raise
+        finally:
+            self.stats.waiting -= 1
+
+        wait = time.monotonic() - start
+        self.stats.acquired += 1
+        self.stats.in_flight += 1
+        self.stats.total_wait += wait
+        self.stats.max_wait = max(self.stats.max_wait, wait)
+        QUEUE_WAIT_SECONDS.observe(wait, provider=self.name)
+
+    async def try_acquire(self) -> bool:
+        """Take a slot only if one is free now, without queueing behind waiters"""
+        semaphore = self._get_semaphore()
+        if semaphore.locked():
+            return False
+        if self.bucket is not None and self.bucket._try_take() > 0:
+            return False
+        # Not locked, so this returns without suspending
+        await semaphore.acquire()
+        self.stats.acquired += 1
+        self.stats.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.stats.in_flight -= 1
+        self._get_semaphore().release()
+
+    async def __aenter__(self) -> "ProviderLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """Process-wide limiter for a provider configured in PROVIDER_LIMITS"""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            if provider not in config.PROVIDER_LIMITS:
+                raise KeyError(f"No limits configured for provider: {provider}")
+            limiter = ProviderLimiter(provider, **config.PROVIDER_LIMITS[provider])
+            _limiters[provider] = limiter
+        return limiter
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Queue-wait and occupancy metrics for every active limiter"""
+    with _limiters_lock:
+        return {name: limiter.stats.as_dict() for name, limiter in _limiters.items()}
@@ -0,0 +1,295 @@
+"""
+Process-wide LLM provider
+
+One ChatOpenAI client per role, all sharing a keep-alive HTTP connection pool,
+with the structured-output chain for every schema built once and reused.
+langchain_openai and httpx are imported when the first client is built, so
+importing this module (and the agents) does not pay for them.
+"""
+import threading
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional, Tuple, Type
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel
+
+from deep_research import config
+from deep_research import replay
+from deep_research.limits import get_limiter
+from deep_research.resilience import UpstreamError, call_with_resilience
+from deep_research.telemetry import LLM_CALLS, record_tokens, span
+from deep_research.tools.utils import count_tokens
+from deep_research.output_schemas import (
+    FinalReport,
+    FollowUpQueries,
+    PlannerOutput,
+    ResearchEvaluation,
+    SectionDraft,
+    TaskExecutionOutput,
+)
+
+if TYPE_CHECKING:
+    import httpx
+    from langchain_openai import ChatOpenAI
+
+
+# Schema each role produces by default
+ROLE_SCHEMAS: Dict[str, Type[BaseModel]] = {
+    "planner": PlannerOutput,
+    "executor": TaskExecutionOutput,
+    "observer": ResearchEvaluation,
+    "writer": FinalReport,
+    "section_writer": SectionDraft,
+    "query_expansion": FollowUpQueries,
+}
+
+_lock = threading.Lock()
+_http_pools: Dict[Optional[int], "httpx.AsyncClient"] = {}
+_llms: Dict[Tuple[str, str], "ChatOpenAI"] = {}
+_structured: Dict[Tuple[str, str, Type[BaseModel]], Runnable] = {}
+
+
+class StructuredOutputError(ValueError):
+    """The model's response did not parse into the requested schema"""
+
+
+def role_config(role: str) -> Dict[str, Any]:
+    """Resolved model settings for a role (or a "<role>.<call_type>" route)"""
+    if role not in config.LLM_ROLES:
+        raise KeyError(f"Unknown LLM role: {role}")
+    return {"temperature": 0, "model": config.DEFAULT_MODEL, **config.LLM_ROLES[role]}
+
+
+def resolve_route(role: str, call_type: Optional[str] = None) -> str:
+    """The LLM_ROLES entry serving this kind of call: "<role>.<call_type>" if configured, else the role"""
+    if call_type and f"{role}.{call_type}" in config.LLM_ROLES:
+        return f"{role}.{call_type}"
+    return role
+
+
+def _get_http_pool(pool_size: Optional[int]) -> "httpx.AsyncClient":
+    import httpx
+
+    # None is the shared pool; an explicit size gets a dedicated pool
+    pool = _http_pools.get(pool_size)
+    if pool is None or pool.is_closed:
+        size = pool_size or config.LLM_POOL_SIZE
+        pool = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=size,
+                max_keepalive_connections=size,
+                keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY,
+            )
+        )
+        _http_pools[pool_size] = pool
+    return pool
+
+
+def get_llm(role: str, model: Optional[str] = None) -> "ChatOpenAI":
+    """Shared chat client for a role, optionally overriding its model"""
+    from langchain_openai import ChatOpenAI
+
+    settings = role_config(role)
+    model = model or settings["model"]
+    with _lock:
+        llm = _llms.get((role, model))
+        if llm is None:
+            llm = ChatOpenAI(
+                model=model,
+                temperature=settings["temperature"],
+                api_key=config.NEBIUS_API_KEY,
+                base_url=config.NEBIUS_BASE_URL,
+                # Retries and deadlines are handled by call_with_resilience
+                max_retries=0,
+                http_async_client=_get_http_pool(settings.get("pool_size")),
+            )
+            _llms[(role, model)] = llm
+        return llm
+
+
+def get_structured_llm(
+    role: str,
+    schema: Optional[Type[BaseModel]] = None,
+    model: Optional[str] = None
+) -> Runnable:
+    """
+    Prebuilt structured-output chain for a role
+
+    The first call builds the chains for every role's default schema so later
+    calls are plain dictionary lookups. Chains return the raw message next to
+    the parsed output so token usage can be metered.
+    """
+    if not _structured:
+        warm_up()
+
+    schema = schema or ROLE_SCHEMAS[role.split(".")[0]]
+    model = model or role_config(role)["model"]
+    key = (role, model, schema)
+    chain = _structured.get(key)
+    if chain is None:
+        chain = get_llm(role, model).with_structured_output(schema, include_raw=True)
+        with _lock:
+            chain = _structured.setdefault(key, chain)
+    return chain
+
+
+def warm_up() -> None:
+    """Build clients and structured chains for every configured route"""
+    for route in config.LLM_ROLES:
+        schema = ROLE_SCHEMAS.get(route.split(".")[0])
+        if schema is None:
+            continue
+        model = role_config(route)["model"]
+        chain = get_llm(route, model).with_structured_output(schema, include_raw=True)
+        with _lock:
+            _structured.setdefault((route, model, schema), chain)
+
+
+async def run_structured(
+    role: str,
+    prompt: ChatPromptTemplate,
+    inputs: Dict[str, Any],
+    schema: Optional[Type[BaseModel]] = None,
+    call_type: Optional[str] = None
+) -> Any:
+    """
+    Render `prompt` and call the structured chain routed for this call
+
+    This is the single boundary every agent LLM call goes through; the
+    provider's "llm" limits, deadline and retries are applied here, with a
+    circuit breaker per model. If the routed model fails (invalid output, an
+    outage or an open breaker) and the route has a fallback_model, the call
+    is repeated on that model. Raises UpstreamError if the call cannot succeed.
+    """
+    schema = schema or ROLE_SCHEMAS[role]
+    route = resolve_route(role, call_type)
+    settings = role_config(route)
+    messages = await prompt.ainvoke(inputs)
+    usage: Dict[str, int] = {}
+
+    async def invoke(model: str) -> BaseModel:
+        output = await get_structured_llm(route, schema, model).ainvoke(messages)
+        for kind, tokens in _usage_from(output["raw"]).items():
+            usage[kind] = usage.get(kind, 0) + tokens
+        if output["parsed"] is None:
+            raise StructuredOutputError(
+                f"{model} returned no valid {schema.__name__}: {output['parsing_error']}"
+            )
+        return output["parsed"]
+
+    async def call(model: str) -> BaseModel:
+        return await call_with_resilience(
+            "llm",
+            lambda: replay.llm_call(role, schema, messages, lambda: invoke(model)),
+            breaker_key=f"llm:{model}",
+            limiter=get_limiter("llm")
+        )
+
+    async def call_with_fallback() -> BaseModel:
+        try:
+            return await call(settings["model"])
+        except UpstreamError as e:
+            fallback = settings.get("fallback_model")
+            if not fallback or fallback == settings["model"]:
+                raise
+            print(f"{route}: {e}; retrying on {fallback}")
+            LLM_CALLS.inc(role=role, outcome="fallback")
+            return await call(fallback)
+
+    async with span("llm", role=role, route=route, model=settings["model"], schema=schema.__name__) as current, span(f"llm.{role}"):
+        try:
+            result = await call_with_fallback()
+        except Exception:
+            LLM_CALLS.inc(role=role, outcome="error")
+            raise
+        LLM_CALLS.inc(role=role, outcome="ok")
+        _meter(role, usage or _estimate_usage(messages, result), current)
+    return result
+
+
+async def stream_structured(
+    role: str,
+    prompt: ChatPromptTemplate,
+    inputs: Dict[str, Any],
+    schema: Optional[Type[BaseModel]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream a structured response as progressively more complete dicts
+
+    Each item is the partial JSON parsed so far; validating the last one
+    against `schema` is left to the caller. Runs under the "llm" limiter but,
+    unlike run_structured, is not retried - a stream that already produced
+    output cannot be transparently restarted.
+    """
+    schema = schema or ROLE_SCHEMAS[role]
+    messages = await prompt.ainvoke(inputs)
+
+    if replay.mode() != "off":
+        # Recorded, replayed and simulated plans arrive as one complete object
+        async with span("llm", role=role, schema=schema.__name__) as current, span(f"llm.{role}"), get_limiter("llm"):
+            result = await replay.llm_call(
+                role, schema, messages,
+                lambda: _collect_stream(role, schema, messages)
+            )
+            LLM_CALLS.inc(role=role, outcome="ok")
+            _meter(role, _estimate_usage(messages, result), current)
+        yield result.model_dump()
+        return
+
+    # Streamed responses carry no usage block, so tokens are estimated
+    final: Dict[str, Any] = {}
+    async with span("llm", role=role, schema=schema.__name__, streamed=True) as current, span(f"llm.{role}"), get_limiter("llm"):
+        async for partial in _stream(role, schema, messages):
+            final = partial
+            yield partial
+        LLM_CALLS.inc(role=role, outcome="ok")
+        _meter(role, _estimate_usage(messages, final), current)
+
+
+def _stream(role: str, schema: Type[BaseModel], messages: Any) -> AsyncIterator[Dict[str, Any]]:
+    from langchain_core.output_parsers import JsonOutputParser
+
+    streaming_llm = get_llm(role).bind(response_format={
+        "type": "json_schema",
+        "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema()}
+    }) | JsonOutputParser()
+    return streaming_llm.astream(messages)
+
+
+async def _collect_stream(role: str, schema: Type[BaseModel], messages: Any) -> BaseModel:
+    final: Dict[str, Any] = {}
+    async for partial in _stream(role, schema, messages):
+        final = partial
+    return schema.model_validate(final)
+
+
+def _usage_from(raw: Any) -> Dict[str, int]:
+    usage = getattr(raw, "usage_metadata", None) or {}
+    if not usage:
+        return {}
+    return {"prompt": usage.get("input_tokens", 0), "completion": usage.get("output_tokens", 0)}
+
+
+def _estimate_usage(messages: Any, output: Any) -> Dict[str, int]:
+    """Token counts of the prompt and output when the provider reports none"""
+    prompt_text = "".join(str(m.content) for m in messages.to_messages())
+    output_text = output.model_dump_json() if isinstance(output, BaseModel) else str(output)
+    return {"prompt": count_tokens(prompt_text), "completion": count_tokens(output_text)}
+
+
+def _meter(role: str, usage: Dict[str, int], current: Any) -> None:
+    record_tokens(role, usage["prompt"], usage["completion"])
+    if current is not None:
+        current.set_attribute("llm.prompt_tokens", usage["prompt"])
+        current.set_attribute("llm.completion_tokens", usage["completion"])
+
+
+async def close() -> None:
+    """Close the shared HTTP pools and drop cached clients"""
+    with _lock:
+        pools = list(_http_pools.values())
+        _http_pools.clear()
+        _llms.clear()
+        _structured.clear()
+    for pool in pools:
+        await pool.aclose()
@@ -0,0 +1,380 @@
+"""
+Command-line entry point
+
+    python -m deep_research.main batch queries.jsonl --output results.jsonl
+    python -m deep_research.main serve --port 8000
+
+`batch` reads one {"query": ..., "id": ...} object per line and runs the
+queries concurrently on one event loop, with at most --concurrency runs in
+flight. Every run shares the process's search/extract caches, LLM client
+pool and provider rate limiters, and each result is appended to the output
+JSONL as soon as its run finishes. --workers shards the queries across a
+process pool; the workers then share the SQLite cache tier and split the
+provider limits between them so the combined rate stays within config.
+
+`serve` starts an HTTP service (aiohttp) around one compiled graph. POST
+/research {"query": ...} admits the job into a bounded queue (503 once
+SERVER_QUEUE_SIZE jobs are waiting), runs at most SERVER_MAX_JOBS at a time
+and streams progress as server-sent events: queued, started, plan,
+task_started/task_completed, verdict, report_delta (report text as it is
+written), report, then done or error. GET /health reports the load and GET
+/metrics the Prometheus metrics.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from deep_research import config
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Deep research agent")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="Run a JSONL file of queries")
+    batch.add_argument("queries", help="JSONL file of {\"query\": ..., \"id\": ...} objects")
+    batch.add_argument("--output", default="results.jsonl", help="JSONL file results are appended to")
+    batch.add_argument("--concurrency", type=int, default=4, help="Runs in flight per process")
+    batch.add_argument("--workers", type=int, default=1, help="Processes to shard the queries across")
+    batch.add_argument("--max-iterations", type=int, default=2)
+    batch.add_argument("--checkpoint", action="store_true",
+                       help="Checkpoint each run under its id and resume interrupted ones")
+    batch.add_argument("--verbose", action="store_true", help="Show agent output")
+
+    serve = commands.add_parser("serve", help="Serve research jobs over HTTP with streamed progress")
+    serve.add_argument("--host", default=config.SERVER_HOST)
+    serve.add_argument("--port", type=int, default=config.SERVER_PORT)
+    serve.add_argument("--max-jobs", type=int, default=config.SERVER_MAX_JOBS, help="Jobs running at once")
+    serve.add_argument("--queue-size", type=int, default=config.SERVER_QUEUE_SIZE, help="Jobs allowed to wait")
+    return parser.parse_args(argv)
+
+
+def load_queries(path: str) -> List[Dict[str, Any]]:
+    """Query records with an id each (the line number when none is given)"""
+    records = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            record.setdefault("id", str(line_number))
+            records.append(record)
+    return records
+
+
+class ResultWriter:
+    """Appends one JSON line per result; O_APPEND keeps lines from several processes whole"""
+
+    def __init__(self, path: str):
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        os.write(self._fd, (json.dumps(record, default=str) + "\n").encode("utf-8"))
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+async def run_batch(
+    records: List[Dict[str, Any]],
+    output: str,
+    concurrency: int,
+    max_iterations: int = 2,
+    checkpoint: bool = False,
+    verbose: bool = False
+) -> Dict[str, int]:
+    """Run every record on this event loop, streaming results to `output`"""
+    # Imported here so worker processes apply their config overrides first
+    from deep_research import llm
+    from deep_research.checkpoint import open_checkpointer, run_research
+    from deep_research.graph import create_research_graph
+    from deep_research.state import new_research_state
+    from deep_research.tools.blobs import blob_scope
+
+    writer = ResultWriter(output)
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"succeeded": 0, "failed": 0}
+
+    async with open_checkpointer(None if checkpoint else "") as saver:
+        app = create_research_graph(saver)
+
+        async def run_one(record: Dict[str, Any]) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                iterations = record.get("max_iterations", max_iterations)
+                result: Dict[str, Any] = {"id": record["id"], "query": record["query"]}
+                try:
+                    if saver is not None:
+                        final_state = await run_research(app, record["query"], f"batch:{record['id']}", iterations)
+                    else:
+                        with blob_scope():
+                            final_state = await app.ainvoke(new_research_state(record["query"], iterations))
+                    result.update({
+                        "ok": True,
+                        "final_output": final_state.get("final_output", {}),
+                        "iterations": final_state.get("iteration_count", 0) + 1,
+                        "total_tokens_used": final_state.get("total_tokens_used", 0),
+                        "search_calls_used": final_state.get("search_calls_used", 0),
+                    })
+                    counts["succeeded"] += 1
+                except Exception as e:
+                    result.update({"ok": False, "error": repr(e)})
+                    counts["failed"] += 1
+                result["wall_time"] = round(time.perf_counter() - start, 3)
+                writer.write(result)
+                status = "ok" if result["ok"] else f"failed: {result['error']}"
+                print(f"[{record['id']}] {status} in {result['wall_time']:.1f}s", file=sys.stderr)
+
+        output_stream = sys.stdout if verbose else io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output_stream):
+                await asyncio.gather(*[run_one(record) for record in records])
+        finally:
+            writer.close()
+            await llm.close()
+    return counts
+
+
+def _share_across_workers(workers: int) -> None:
+    """Worker-process config: shared SQLite cache tier and a 1/workers share of each provider limit"""
+    if config.CACHE_BACKEND == "memory":
+        config.CACHE_BACKEND = "tiered"
+    config.PROVIDER_LIMITS = {
+        provider: {
+            "concurrency": max(1, limits["concurrency"] // workers),
+            "rate": limits["rate"] / workers if limits.get("rate") else limits.get("rate"),
+            "burst": max(1, limits["burst"] // workers) if limits.get("burst") else limits.get("burst"),
+        }
+        for provider, limits in config.PROVIDER_LIMITS.items()
+    }
+
+
+def _run_shard(shard: List[Dict[str, Any]], args: argparse.Namespace) -> Dict[str, int]:
+    _share_across_workers(args.workers)
+    return asyncio.run(run_batch(
+        shard, args.output, args.concurrency, args.max_iterations, args.checkpoint, args.verbose
+    ))
+
+
+def batch_command(args: argparse.Namespace) -> None:
+    records = load_queries(args.queries)
+    start = time.perf_counter()
+
+    if args.workers <= 1:
+        counts = asyncio.run(run_batch(
+            records, args.output, args.concurrency, args.max_iterations, args.checkpoint, args.verbose
+        ))
+    else:
+        shards = [records[i::args.workers] for i in range(args.workers)]
+        counts = {"succeeded": 0, "failed": 0}
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for shard_counts in pool.map(_run_shard, shards, [args] * len(shards)):
+                for key, value in shard_counts.items():
+                    counts[key] += value
+
+    print(f"{counts['succeeded']} succeeded, {counts['failed']} failed in "
+          f"{time.perf_counter() - start:.1f}s; results in {args.output}")
+
+
+class Job:
+    """One research request and the events produced for it"""
+
+    def __init__(self, query: str, max_iterations: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.query = query
+        self.max_iterations = max_iterations
+        # (event, data) pairs; None marks the end of the stream
+        self.events: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Future] = None
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        if self.task is not None:
+            self.task.cancel()
+
+
+class JobQueue:
+    """Admission control: `max_jobs` run at once and at most `queue_size` wait for a slot"""
+
+    def __init__(self, app: Any, max_jobs: int, queue_size: int):
+        self.app = app
+        self.max_jobs = max_jobs
+        self.running = 0
+        self.queue_size = queue_size
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.Future] = []
+
+    def start(self) -> None:
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.max_jobs)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    def submit(self, job: Job) -> int:
+        """Queue `job` and return its position; raises asyncio.QueueFull when saturated"""
+        # Counted rather than left to the queue's maxsize: a job submitted a
+        # moment ago may not have been picked up by an idle worker yet
+        if self.running + self._queue.qsize() >= self.max_jobs + self.queue_size:
+            raise asyncio.QueueFull
+        self._queue.put_nowait(job)
+        return self._queue.qsize()
+
+    def load(self) -> Dict[str, int]:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "max_jobs": self.max_jobs,
+            "queue_size": self.queue_size,
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            if job.cancelled:
+                continue
+            self.running += 1
+            job.task = asyncio.ensure_future(run_job(self.app, job))
+            try:
+                await asyncio.gather(job.task, return_exceptions=True)
+            finally:
+                self.running -= 1
+
+
+async def run_job(app: Any, job: Job) -> None:
+    """Run the graph for `job`, translating its stream into progress events"""
+    from deep_research.state import new_research_state
+    from deep_research.tools.blobs import blob_scope
+
+    await job.events.put(("started", {"job_id": job.id}))
+    try:
+        with blob_scope():
+            async for mode, chunk in app.astream(
+                new_research_state(job.query, job.max_iterations),
+                stream_mode=["updates", "custom"]
+            ):
+                if mode == "custom":
+                    data = dict(chunk)
+                    await job.events.put((data.pop("event"), data))
+                    continue
+                for node, update in chunk.items():
+                    await job.events.put(("node_completed", {"node": node}))
+                    if node == "writer" and update:
+                        await job.events.put(("report", {
+                            "final_output": update.get("final_output", {}),
+                            "total_tokens_used": update.get("total_tokens_used"),
+                        }))
+        await job.events.put(("done", {"job_id": job.id}))
+    except asyncio.CancelledError:
+        print(f"Job {job.id} cancelled")
+        raise
+    except Exception as e:
+        await job.events.put(("error", {"job_id": job.id, "error": str(e)}))
+    finally:
+        job.events.put_nowait(None)
+
+
+def create_server(max_jobs: int, queue_size: int) -> Any:
+    """aiohttp application serving research jobs from one compiled graph"""
+    from aiohttp import web
+
+    from deep_research import llm
+    from deep_research.graph import create_research_graph
+    from deep_research.telemetry import render_prometheus
+
+    async def send_event(response: Any, event: str, data: Dict[str, Any]) -> None:
+        payload = json.dumps(data, default=str)
+        await response.write(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"))
+
+    async def research(request: Any) -> Any:
+        try:
+            body = await request.json()
+            query = str(body["query"]).strip()
+            max_iterations = int(body.get("max_iterations", 2))
+        except (ValueError, KeyError, TypeError):
+            return web.json_response({"error": "expected JSON body with a \"query\""}, status=400)
+        if not query:
+            return web.json_response({"error": "query is empty"}, status=400)
+
+        jobs: JobQueue = request.app["jobs"]
+        job = Job(query, max_iterations)
+        try:
+            position = jobs.submit(job)
+        except asyncio.QueueFull:
+            return web.json_response(
+                {"error": "server busy, retry later", **jobs.load()},
+                status=503,
+                headers={"Retry-After": "30"}
+            )
+
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+        await response.prepare(request)
+        try:
+            await send_event(response, "queued", {"job_id": job.id, "position": position})
+            while True:
+                item = await job.events.get()
+                if item is None:
+                    break
+                await send_event(response, *item)
+        except (ConnectionResetError, asyncio.CancelledError):
+            # The client went away; stop spending on its job
+            job.cancel()
+            raise
+        return response
+
+    async def health(request: Any) -> Any:
+        return web.json_response({"status": "ok", **request.app["jobs"].load()})
+
+    async def metrics(request: Any) -> Any:
+        return web.Response(text=render_prometheus(), content_type="text/plain")
+
+    async def on_startup(app: Any) -> None:
+        # Compiled once; every job streams from the same graph
+        app["jobs"] = JobQueue(create_research_graph(), max_jobs, queue_size)
+        app["jobs"].start()
+
+    async def on_cleanup(app: Any) -> None:
+        await app["jobs"].stop()
+        await llm.close()
+
+    app = web.Application()
+    app.router.add_post("/research", research)
+    app.router.add_get("/health", health)
+    app.router.add_get("/metrics", metrics)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def serve_command(args: argparse.Namespace) -> None:
+    from aiohttp import web
+
+    # Report text is streamed to clients as it is written
+    config.WRITER_STREAM = True
+    web.run_app(create_server(args.max_jobs, args.queue_size), host=args.host, port=args.port)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.command == "batch":
+        batch_command(args)
+    elif args.command == "serve":
+        serve_command(args)
+
+
+if __name__ == "__main__":
+    main()
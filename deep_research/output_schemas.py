@@ -16,6 +16,10 @@ class TaskExecutionOutput(BaseModel):
     reasoning: str = Field(description="Step-by-step reasoning")
     structured_output: dict[str, Any] = Field(description="Findings matching required schema")
     key_insights: list[str] = Field(description="3-5 key takeaways")
+    is_sufficient: bool = Field(default=True, description="Do the sources support every output schema field?")
+    field_confidence: dict[str, float] = Field(default_factory=dict, description="Confidence 0-1 per output schema field")
+    missing_fields: list[str] = Field(default_factory=list, description="Output schema fields the sources could not answer")
+    needed_urls: list[str] = Field(default_factory=list, description="Source URLs whose full page would fill the missing fields")
 
 class FinalReport(BaseModel):
     """What Observer LLM generates"""
@@ -26,6 +30,22 @@ class FinalReport(BaseModel):
     all_citations: list[str] = Field(description="All unique URLs")
     confidence_score: float = Field(description="0.0 to 1.0", ge=0.0, le=1.0)
 
+class SectionDraft(BaseModel):
+    """What the map step of the map-reduce writer generates per section"""
+    title: str = Field(description="Section heading")
+    findings: str = Field(description="Detailed findings of these tasks, with specifics")
+    key_insights: list[str] = Field(description="Most important insights of this section")
+    citations: list[str] = Field(description="URLs supporting this section")
+    confidence: float = Field(description="0.0 to 1.0", ge=0.0, le=1.0)
+
+class QueryExpansion(BaseModel):
+    task_id: str = Field(description="ID of the follow-up task")
+    search_queries: list[str] = Field(description="Diverse, specific search queries for the task")
+
+class FollowUpQueries(BaseModel):
+    """What the follow-up query refiner generates"""
+    expansions: list[QueryExpansion] = Field(description="Search queries for each follow-up task")
+
 class ResearchEvaluation(BaseModel):
         is_complete: bool = Field(description="Is the research comprehensive enough?")
         confidence: float = Field(description="Confidence 0-1 in completeness")
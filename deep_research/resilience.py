@@ -0,0 +1,305 @@
+"""
+Deadlines, retries, hedging and circuit breaking for upstream calls
+
+`call_with_resilience` wraps a zero-argument coroutine factory. Each attempt
+runs under a deadline and may be hedged with a duplicate request if it is
+slow; transient failures (timeouts, connection errors, 429 and 5xx) are
+retried with jittered exponential backoff; and a circuit breaker per provider
+(or per model) fails fast while it is down. Other errors - 4xx responses,
+local parse failures - fail the call at once without counting against the
+breaker.
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from deep_research import config
+from deep_research.limits import ProviderLimiter
+
+T = TypeVar("T")
+
+
+class UpstreamError(Exception):
+    """An upstream call failed after all retries"""
+
+    def __init__(self, provider: str, cause: BaseException, attempts: int):
+        self.provider = provider
+        self.cause = cause
+        self.attempts = attempts
+        super().__init__(f"{provider} failed after {attempts} attempt(s): {cause!r}")
+
+
+class CircuitOpenError(UpstreamError):
+    """The provider's circuit breaker is open; the call was not attempted"""
+
+    def __init__(self, provider: str, retry_in: float):
+        self.provider = provider
+        self.cause = None
+        self.attempts = 0
+        self.retry_in = retry_in
+        Exception.__init__(self, f"{provider} circuit open, retry in {retry_in:.1f}s")
+
+
+# Upstream client errors that mean "try again later", matched by class name so
+# the SDKs (httpx, openai, tavily) need not be imported here
+_TRANSIENT_ERROR_NAMES = {
+    "TimeoutException", "TransportError",  # httpx
+    "APIConnectionError", "APITimeoutError",  # openai
+    "TimeoutError", "UsageLimitExceededError",  # tavily (its own TimeoutError, and 429)
+}
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failed call may succeed if retried"""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in _TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    status = _status_code(error)
+    return status is not None and (status in (408, 429) or status >= 500)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures
+
+    While open every call fails immediately. After `reset_timeout` one trial
+    call is let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = config.BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = config.BREAKER_RESET_TIMEOUT
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """Admit a call or raise CircuitOpenError; True if it is the half-open trial"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return False
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        raise CircuitOpenError(self.name, retry_in)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Give up the half-open trial without an outcome (e.g. it was cancelled)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class ProviderStats:
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.short_circuited = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_stats: Dict[str, ProviderStats] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    with _registry_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = _breakers[provider] = CircuitBreaker(provider)
+        return breaker
+
+
+def _get_stats(provider: str) -> ProviderStats:
+    with _registry_lock:
+        stats = _stats.get(provider)
+        if stats is None:
+            stats = _stats[provider] = ProviderStats()
+        return stats
+
+
+def backoff_delay(attempt: int, base: float = config.BACKOFF_BASE, cap: float = config.BACKOFF_MAX) -> float:
+    """Full-jitter exponential backoff for the given (1-based) retry"""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+async def _hedged(
+    fn: Callable[[], Awaitable[T]],
+    timeout: float,
+    hedge_after: Optional[float],
+    stats: ProviderStats,
+    limiter: Optional[ProviderLimiter] = None
+) -> T:
+    """
+    One attempt: first success among the original and an optional hedge
+
+    With a limiter, the original waits for its slot before the deadline and
+    hedge clocks start, so local queueing is never mistaken for a slow
+    upstream; the hedge is only sent if a slot is free at that moment.
+    """
+    held = 0  # limiter slots to give back
+    if limiter is not None:
+        await limiter.acquire()
+        held = 1
+    running: list = []
+    try:
+        if hedge_after is None or hedge_after >= timeout:
+            return await asyncio.wait_for(fn(), timeout)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        running.append(asyncio.ensure_future(fn()))
+        done, _ = await asyncio.wait(running, timeout=hedge_after)
+        if not done and (limiter is None or await limiter.try_acquire()):
+            if limiter is not None:
+                held += 1
+            stats.hedges += 1
+            running.append(asyncio.ensure_future(fn()))
+
+        last_error: Optional[BaseException] = None
+        pending = set(running)
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                raise asyncio.TimeoutError()
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                last_error = task.exception()
+        raise last_error
+    finally:
+        for task in running:
+            if not task.done():
+                task.cancel()
+        for _ in range(held):
+            limiter.release()
+
+
+async def call_with_resilience(
+    provider: str,
+    fn: Callable[[], Awaitable[T]],
+    timeout: Optional[float] = None,
+    attempts: Optional[int] = None,
+    hedge_after: Optional[float] = None,
+    breaker_key: Optional[str] = None,
+    limiter: Optional[ProviderLimiter] = None
+) -> T:
+    """
+    Call `fn()` with the provider's deadline, retry, hedging and breaker policy
+
+    Settings default to config.RESILIENCE[provider]. `breaker_key` selects
+    the circuit breaker (default: the provider), e.g. one per model. Each
+    request holds a slot of `limiter`, taken before its deadline starts. Raises
+    UpstreamError (or CircuitOpenError) once the call cannot succeed; errors
+    that are not transient are raised after the first attempt.
+    """
+    policy = config.RESILIENCE.get(provider, {})
+    timeout = timeout if timeout is not None else policy.get("timeout", config.SEARCH_TIMEOUT)
+    attempts = attempts if attempts is not None else policy.get("attempts", 1)
+    hedge_after = hedge_after if hedge_after is not None else policy.get("hedge_after")
+
+    breaker = get_breaker(breaker_key or provider)
+    stats = _get_stats(provider)
+    stats.calls += 1
+
+    last_error: Optional[BaseException] = None
+    for attempt in range(1, attempts + 1):
+        if attempt > 1:
+            stats.retries += 1
+            await asyncio.sleep(backoff_delay(attempt - 1))
+        try:
+            is_trial = breaker.before_call()
+        except CircuitOpenError:
+            stats.short_circuited += 1
+            raise
+
+        try:
+            result = await _hedged(fn, timeout, hedge_after, stats, limiter)
+        except asyncio.TimeoutError as e:
+            stats.timeouts += 1
+            breaker.record_failure()
+            last_error = e
+        except Exception as e:
+            if not is_transient(e):
+                # Says nothing about the provider's health: neither resets nor adds
+                # to the failure count, and retrying would not help
+                if is_trial:
+                    breaker.release_trial()
+                stats.failures += 1
+                raise UpstreamError(provider, e, attempt) from e
+            breaker.record_failure()
+            last_error = e
+        except BaseException:
+            # Cancelled: no outcome to record, but the next call may be the trial
+            if is_trial:
+                breaker.release_trial()
+            raise
+        else:
+            breaker.record_success()
+            return result
+
+    stats.failures += 1
+    raise UpstreamError(provider, last_error, attempts)
+
+
+def resilience_stats() -> Dict[str, Dict[str, Any]]:
+    """Retry/hedge/timeout counters and breaker state per provider"""
+    with _registry_lock:
+        names = sorted(_stats)
+        breakers = dict(_breakers)
+    report = {}
+    for name in names:
+        report[name] = _get_stats(name).as_dict()
+        keyed = {key: b.state for key, b in breakers.items() if key.startswith(f"{name}:")}
+        report[name]["breaker"] = keyed if keyed else get_breaker(name).state
+    return report
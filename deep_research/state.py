@@ -13,11 +13,12 @@ class ResearchTask(TypedDict):
 class TaskResult(TypedDict):
     '''Result from a completed task'''
     task_id: str
-    search_results: list[dict]
+    search_results: list[dict]  # content held as blob refs, see tools/blobs.py
     reasoning: str
     structured_output: dict
     citations: list[str]
     key_insights: list[str]
+    errors: list[str]
 
 class ResearchState(TypedDict):
     '''Main state that flows through the graph'''
@@ -32,6 +33,7 @@ class ResearchState(TypedDict):
     final_output: dict
 
     total_tokens_used: int
+    search_calls_used: int  # counted against config.SEARCH_BUDGET
     execution_time: float
 
     iteration_count: int
@@ -39,3 +41,25 @@ class ResearchState(TypedDict):
     research_complete: bool
     identified_gaps: list[str]
     follow_up_tasks: list[ResearchTask]
+    early_verdict: dict  # complete verdict from the streaming executor, reused by the observer
+
+
+def new_research_state(query: str, max_iterations: int = 2) -> ResearchState:
+    '''Initial state for a research run'''
+    return {
+        "query": query,
+        "research_plan": "",
+        "tasks": [],
+        "task_results": [],
+        "full_context": "",
+        "final_output": {},
+        "total_tokens_used": 0,
+        "search_calls_used": 0,
+        "execution_time": 0.0,
+        "iteration_count": 0,
+        "max_iterations": max_iterations,
+        "research_complete": False,
+        "identified_gaps": [],
+        "follow_up_tasks": [],
+        "early_verdict": {}
+    }
@@ -0,0 +1,340 @@
+"""
+Tracing spans, metrics and token accounting
+
+Everything except token metering is off unless config.TELEMETRY_ENABLED is
+set; while off, `span` yields immediately and metric updates return before
+touching any state. When on:
+
+- spans nest through contextvars and carry OpenTelemetry-style trace/span
+  ids and attributes; they are kept in a bounded buffer and, if the
+  opentelemetry package is installed, mirrored to its tracer
+- every span feeds a duration histogram and the latency samples the
+  benchmark summarizes
+- counters and histograms render in the Prometheus text format
+
+Token usage is always metered because it populates total_tokens_used.
+"""
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+
+from deep_research import config
+
+
+def is_enabled() -> bool:
+    return config.TELEMETRY_ENABLED
+
+
+# --- Spans ----------------------------------------------------------------
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_time: float
+    end_time: Optional[float] = None
+    status: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return (self.end_time or time.time()) - self.start_time
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": int(self.start_time * 1e9),
+            "end_time_unix_nano": int((self.end_time or 0) * 1e9),
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("deep_research_span", default=None)
+_spans: Deque[Span] = deque(maxlen=config.TELEMETRY_MAX_SPANS)
+_otel_tracer: Any = None
+_lock = threading.Lock()
+
+# Latency samples per span name, summarized by the benchmark: percentiles come
+# from the most recent TELEMETRY_MAX_SAMPLES, count and total are exact
+_samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=config.TELEMETRY_MAX_SAMPLES))
+_totals: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+_in_flight: Dict[str, int] = defaultdict(int)
+_max_in_flight: Dict[str, int] = defaultdict(int)
+
+
+def _get_otel_tracer() -> Any:
+    global _otel_tracer
+    if _otel_tracer is None:
+        try:
+            from opentelemetry import trace
+            _otel_tracer = trace.get_tracer("deep_research")
+        except ImportError:
+            _otel_tracer = False
+    return _otel_tracer
+
+
+@asynccontextmanager
+async def span(name: str, **attributes: Any) -> AsyncIterator[Optional[Span]]:
+    """
+    Trace the enclosed block
+
+    Yields the Span (or None while telemetry is disabled) so callers can
+    attach attributes discovered during the work.
+    """
+    if not is_enabled():
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+        span_id=os.urandom(8).hex(),
+        parent_id=parent.span_id if parent else None,
+        start_time=time.time(),
+        attributes=attributes
+    )
+    token = _current_span.set(current)
+    with _lock:
+        _in_flight[name] += 1
+        _max_in_flight[name] = max(_max_in_flight[name], _in_flight[name])
+
+    tracer = _get_otel_tracer()
+    otel_cm = tracer.start_as_current_span(name, attributes=attributes) if tracer else None
+    otel_span = otel_cm.__enter__() if otel_cm else None
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.set_attribute("exception.type", type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        current.end_time = current.start_time + elapsed
+        _current_span.reset(token)
+        if otel_span is not None:
+            for key, value in current.attributes.items():
+                otel_span.set_attribute(key, value if isinstance(value, (str, int, float, bool)) else str(value))
+            otel_cm.__exit__(None, None, None)
+        with _lock:
+            _in_flight[name] -= 1
+            _samples[name].append(elapsed)
+            _totals[name][0] += 1
+            _totals[name][1] += elapsed
+            _spans.append(current)
+        SPAN_SECONDS.observe(elapsed, span=name, status=current.status)
+
+
+def recent_spans() -> List[Dict[str, Any]]:
+    """Finished spans, oldest first, as OpenTelemetry-style dicts"""
+    with _lock:
+        return [s.to_dict() for s in _spans]
+
+
+# --- Metrics --------------------------------------------------------------
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        if not is_enabled():
+            return
+        key = _label_key(labels)
+        with _lock:
+            self._values[key] += amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = defaultdict(float)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        if not is_enabled():
+            return
+        key = _label_key(labels)
+        with _lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._sums[key] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, counts in sorted(self._counts.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {counts[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {self._sums[key]:g}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {counts[-1]}")
+        return lines
+
+
+SPAN_SECONDS = Histogram("deep_research_span_duration_seconds", "Duration of traced spans")
+QUEUE_WAIT_SECONDS = Histogram("deep_research_queue_wait_seconds", "Time spent waiting for a provider limiter")
+LLM_CALLS = Counter("deep_research_llm_calls_total", "Structured LLM calls by role and outcome")
+LLM_TOKENS = Counter("deep_research_llm_tokens_total", "LLM tokens by role and kind (prompt/completion)")
+TAVILY_REQUESTS = Counter("deep_research_tavily_requests_total", "Tavily requests by operation and outcome")
+SEARCH_DECISIONS = Counter("deep_research_search_decisions_total", "Task searches by depth decision (basic/escalated/over_budget)")
+
+METRICS = [SPAN_SECONDS, QUEUE_WAIT_SECONDS, LLM_CALLS, LLM_TOKENS, TAVILY_REQUESTS, SEARCH_DECISIONS]
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    with _lock:
+        lines = [line for metric in METRICS for line in metric.render()]
+    return "\n".join(lines) + "\n"
+
+
+# --- Tokens ---------------------------------------------------------------
+
+@dataclass
+class TokenMeter:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+_token_meter: ContextVar[Optional[TokenMeter]] = ContextVar("deep_research_tokens", default=None)
+
+
+@contextmanager
+def metered_tokens() -> Iterator[TokenMeter]:
+    """Collect token usage of every LLM call made inside the block (including child tasks)"""
+    meter = TokenMeter()
+    token = _token_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _token_meter.reset(token)
+
+
+def record_tokens(role: str, prompt_tokens: int, completion_tokens: int) -> None:
+    meter = _token_meter.get()
+    if meter is not None:
+        meter.prompt_tokens += prompt_tokens
+        meter.completion_tokens += completion_tokens
+    LLM_TOKENS.inc(prompt_tokens, role=role, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, role=role, kind="completion")
+
+
+# --- Latency summaries ----------------------------------------------------
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile, q in [0, 100]"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "total": sum(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0
+    }
+
+
+def latency_report(wall_time: float = 0.0) -> Dict[str, Dict[str, Any]]:
+    """
+    Percentile summary per span name
+
+    With `wall_time`, also reports mean concurrency: total busy time of the
+    span divided by the elapsed wall time.
+    """
+    with _lock:
+        snapshot = {name: list(values) for name, values in _samples.items()}
+        totals = {name: tuple(total) for name, total in _totals.items()}
+        peaks = dict(_max_in_flight)
+    report = {}
+    for name, values in sorted(snapshot.items()):
+        summary = summarize(values)
+        count, total = totals[name]
+        summary.update(count=count, total=total, mean=total / count if count else 0.0)
+        summary["max_in_flight"] = peaks.get(name, 0)
+        if wall_time > 0:
+            summary["mean_concurrency"] = summary["total"] / wall_time
+        report[name] = summary
+    return report
+
+
+def reset() -> None:
+    """
+    Drop recorded spans, samples and metric values
+
+    Spans still open keep their in-flight count, so it cannot go negative
+    when they finish; the peaks restart from the current levels.
+    """
+    with _lock:
+        _samples.clear()
+        _totals.clear()
+        _max_in_flight.clear()
+        for name, count in list(_in_flight.items()):
+            if count:
+                _max_in_flight[name] = count
+            else:
+                del _in_flight[name]
+        _spans.clear()
+        for metric in METRICS:
+            for attr in ("_values", "_counts", "_sums"):
+                if hasattr(metric, attr):
+                    getattr(metric, attr).clear()
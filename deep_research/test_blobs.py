@@ -0,0 +1,118 @@
+"""
+Blob store lifetime: per-run release, spill-dir eviction and clearing
+
+    python -m pytest deep_research/test_blobs.py
+"""
+import os
+import tempfile
+import time
+
+from deep_research.tools import blobs
+from deep_research.tools.blobs import BlobNotFound, BlobStore, blob_scope
+
+
+def spilled_files(directory: str) -> list:
+    return [name for _, _, names in os.walk(directory) for name in names]
+
+
+def use_store(store: BlobStore) -> None:
+    blobs._store = store
+
+
+def teardown_function(function) -> None:
+    blobs._store = None
+
+
+def test_run_blobs_are_released_when_the_run_ends():
+    store = BlobStore(memory_limit=1 << 20)
+    use_store(store)
+    with blob_scope():
+        ref = store.put("page this run fetched")
+        assert store.get(ref) == "page this run fetched"
+    try:
+        store.get(ref)
+    except BlobNotFound:
+        pass
+    else:
+        raise AssertionError("released blob is still stored")
+    assert store.stats.memory_bytes == 0
+
+
+def test_concurrent_holder_keeps_blob():
+    store = BlobStore(memory_limit=1 << 20)
+    ref = store.put("shared page", owner="run-a")
+    store.put("shared page", owner="run-b")
+    store.release("run-a")
+    assert store.get(ref) == "shared page"
+    store.release("run-b")
+    assert store.stats.memory_bytes == 0
+
+
+def test_failed_run_keeps_blobs_on_disk_for_resume():
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store = BlobStore(memory_limit=1 << 20, spill_dir=spill_dir)
+        use_store(store)
+        try:
+            with blob_scope(keep_on_error=True):
+                ref = store.put("page needed on resume")
+                raise RuntimeError("writer failed")
+        except RuntimeError:
+            pass
+        assert store.stats.memory_bytes == 0
+        assert store.get(ref) == "page needed on resume"
+
+
+def test_spill_dir_is_bounded_and_cleared():
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store = BlobStore(memory_limit=10, spill_dir=spill_dir, disk_limit=100)
+        refs = [store.put(f"page {i} " + "x" * 30) for i in range(10)]
+        assert store.stats.disk_bytes <= 100
+        assert store.stats.evicted > 0
+        assert len(spilled_files(spill_dir)) == len(store._on_disk)
+        assert store.get(refs[-1]).startswith("page 9")
+
+        store.clear()
+        assert spilled_files(spill_dir) == []
+        assert store.stats.disk_bytes == 0
+
+
+def test_expired_files_from_earlier_processes_are_removed():
+    with tempfile.TemporaryDirectory() as spill_dir:
+        first = BlobStore(memory_limit=0, spill_dir=spill_dir)
+        old = first.put("old page")
+        first.put("newer page")
+        first.put("newest page, still in memory")
+        old_path = first._path(old[len(blobs.REF_PREFIX):])
+        past = time.time() - 3600
+        os.utime(old_path, (past, past))
+
+        second = BlobStore(memory_limit=0, spill_dir=spill_dir, disk_ttl=60)
+        assert not os.path.exists(old_path)
+        assert len(second._on_disk) == 1
+
+
+def test_unscoped_blobs_are_evicted_without_a_spill_dir():
+    store = BlobStore(memory_limit=100)
+    held = store.put("page a scoped run holds " + "x" * 40, owner="run-a")
+    unscoped = [store.put(f"unscoped page {i} " + "y" * 40) for i in range(5)]
+    # Only the held blob and the newest unscoped one are left
+    assert len(store._memory) == 2
+    assert store.stats.evicted == 4
+    assert store.get(held).startswith("page a scoped run")
+    assert store.get(unscoped[-1]).startswith("unscoped page 4")
+    try:
+        store.get(unscoped[0])
+    except BlobNotFound:
+        pass
+    else:
+        raise AssertionError("old unscoped blob was kept past the memory limit")
+
+
+def test_disk_eviction_prefers_unheld_blobs():
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store = BlobStore(memory_limit=0, spill_dir=spill_dir, disk_limit=100)
+        held = store.put("held page " + "x" * 30, owner="run-a")
+        for i in range(4):
+            store.put(f"unscoped page {i} " + "y" * 30)
+        assert store.stats.disk_bytes <= 100
+        assert store.get(held).startswith("held page")
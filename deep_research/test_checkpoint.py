@@ -0,0 +1,30 @@
+"""
+Checkpointer setup and task journaling
+
+    python -m pytest deep_research/test_checkpoint.py
+"""
+import asyncio
+import os
+import tempfile
+
+from deep_research.checkpoint import open_checkpointer
+
+
+def test_checkpointer_creates_missing_directory():
+    async def run(path: str):
+        async with open_checkpointer(path) as saver:
+            assert saver is not None
+            await saver.setup()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fresh", "checkout", "checkpoints.sqlite")
+        asyncio.run(run(path))
+        assert os.path.exists(path)
+
+
+def test_empty_path_disables_checkpointing():
+    async def run():
+        async with open_checkpointer("") as saver:
+            assert saver is None
+
+    asyncio.run(run())
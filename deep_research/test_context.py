@@ -0,0 +1,51 @@
+"""
+Context assembly: fragment caching across runs and token counting
+
+    python -m pytest deep_research/test_context.py
+"""
+from deep_research import config
+from deep_research.context import fragment
+from deep_research.tools import utils
+
+
+def failed_result(citations):
+    return {
+        "task_id": "task_1",
+        "search_results": [],
+        "reasoning": "Task failed: llm failed after 3 attempt(s): TimeoutError()",
+        "structured_output": {},
+        "citations": citations,
+        "key_insights": [],
+        "errors": ["llm failed after 3 attempt(s): TimeoutError()"],
+    }
+
+
+def test_same_task_id_and_error_in_two_runs_do_not_share_fragments():
+    first, _ = fragment(failed_result(["https://run-a.example/page"]), "full")
+    second, _ = fragment(failed_result(["https://run-b.example/page"]), "full")
+    assert "run-a" in first
+    assert "run-b" in second and "run-a" not in second
+
+
+def test_identical_results_reuse_the_fragment():
+    result = failed_result(["https://example.org"])
+    assert fragment(result, "brief") is fragment(dict(result), "brief")
+
+
+class CharTokenizer:
+    """One token per character, far denser than the ~4 characters/token estimate"""
+
+    def encode(self, text, disallowed_special=()):
+        return list(text)
+
+
+def test_fragments_are_costed_with_the_tokenizer(monkeypatch):
+    monkeypatch.setattr(utils, "_tokenizer", CharTokenizer())
+    text, tokens = fragment(failed_result(["https://tokenizer.example/page"]), "full")
+    assert tokens == len(text)
+
+
+def test_token_counts_fall_back_to_the_estimate(monkeypatch):
+    monkeypatch.setattr(config, "TOKENIZER_ENCODING", "")
+    monkeypatch.setattr(utils, "_tokenizer", None)
+    assert utils.count_tokens("x" * 40) == 10
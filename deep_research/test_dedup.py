@@ -0,0 +1,44 @@
+"""
+Citation merging for the final report
+
+    python -m pytest deep_research/test_dedup.py
+"""
+from deep_research.tools.dedup import merge_citations
+
+RESULTS = [
+    {"url": "https://example.com/low", "score": 0.2, "content": ""},
+    {"url": "https://example.com/high?utm_source=feed", "score": 0.9, "content": ""},
+    {"url": "https://example.com/searched-not-cited", "score": 0.95, "content": ""},
+]
+
+
+def test_only_cited_urls_are_kept_in_search_rank_order():
+    cited = ["https://example.com/low", "https://www.example.com/high/", "https://example.com/high"]
+    assert merge_citations(cited, RESULTS) == ["https://example.com/high", "https://example.com/low"]
+
+
+def test_citations_outside_the_results_follow_in_order_and_are_capped():
+    cited = ["https://other.org/b", "https://example.com/low", "https://other.org/a", ""]
+    assert merge_citations(cited, RESULTS) == [
+        "https://example.com/low", "https://other.org/b", "https://other.org/a"
+    ]
+    assert merge_citations(cited, RESULTS, limit=2) == ["https://example.com/low", "https://other.org/b"]
+
+
+def test_externalized_results_rank_without_their_text():
+    from deep_research.tools import blobs
+    from deep_research.tools.blobs import BlobStore, externalize_result
+
+    page = "Rust and Go take different approaches to memory management and concurrency in systems code. " * 3
+    blobs._store = BlobStore(memory_limit=1 << 20)
+    try:
+        stored = [
+            externalize_result({"url": "https://example.com/article", "score": 0.4, "content": page}),
+            externalize_result({"url": "https://mirror.example.net/copy", "score": 0.8, "content": page}),
+        ]
+        # The pages are gone, but the mirror is still recognised as the same page
+        blobs._store.clear()
+        cited = ["https://example.com/article", "https://mirror.example.net/copy"]
+        assert merge_citations(cited, stored) == ["https://mirror.example.net/copy"]
+    finally:
+        blobs._store = None
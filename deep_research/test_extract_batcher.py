@@ -0,0 +1,71 @@
+"""
+Bulk extraction: matching results and failures back to their waiters
+
+    python -m pytest deep_research/test_extract_batcher.py
+"""
+import asyncio
+
+from deep_research.tools import search
+from deep_research.tools.cache import MemoryCache, set_cache
+from deep_research.tools.search import ExtractBatcher, ExtractionFailed
+
+
+class FakeTavily:
+    """Echoes URLs back with a trailing slash; `failing` URLs are reported as failed"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.requests = []
+
+    async def extract(self, urls):
+        self.requests.append(list(urls))
+        return {
+            "results": [{"url": url + "/", "raw_content": f"page at {url}"}
+                        for url in urls if url not in self.failing],
+            "failed_results": [{"url": url, "error": "blocked by robots.txt"}
+                               for url in urls if url in self.failing],
+        }
+
+
+def use_client(client: FakeTavily) -> None:
+    search._tavily_client = client
+    set_cache("extract", MemoryCache())
+
+
+def teardown_function(function) -> None:
+    search._tavily_client = None
+    set_cache("extract", MemoryCache())
+
+
+def test_results_match_on_canonical_url():
+    client = FakeTavily()
+    use_client(client)
+    batcher = ExtractBatcher(window=0.01)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit("https://example.com/a"),
+            batcher.submit("https://example.com/b"),
+        )
+
+    assert asyncio.run(run()) == ["page at https://example.com/a", "page at https://example.com/b"]
+    assert len(client.requests) == 1
+
+
+def test_failed_results_reach_their_waiters():
+    client = FakeTavily(failing={"https://example.com/blocked"})
+    use_client(client)
+    batcher = ExtractBatcher(window=0.01)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit("https://example.com/ok"),
+            batcher.submit("https://example.com/blocked"),
+            return_exceptions=True,
+        )
+
+    ok, blocked = asyncio.run(run())
+    assert ok == "page at https://example.com/ok"
+    assert isinstance(blocked, ExtractionFailed)
+    assert blocked.url == "https://example.com/blocked"
+    assert "robots.txt" in str(blocked)
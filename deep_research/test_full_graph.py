@@ -1,6 +1,7 @@
 import asyncio
 from deep_research.state import ResearchState
 from deep_research.graph import create_research_graph
+from deep_research.tools.blobs import blob_scope
 
 
 async def main():
@@ -16,6 +17,7 @@ async def main():
         "full_context": "",
         "final_output": {},
         "total_tokens_used": 0,
+        "search_calls_used": 0,
         "execution_time": 0.0,
         # Iteration controls
         "iteration_count": 0,
@@ -33,7 +35,8 @@ async def main():
     print("="*80)
     
     # Run the graph
-    final_state = await app.ainvoke(initial_state)
+    with blob_scope():
+        final_state = await app.ainvoke(initial_state)
     
     # Print final results
     print("\n\n" + "="*80)
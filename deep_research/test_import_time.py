@@ -0,0 +1,94 @@
+"""
+Import-time check for the package entry points
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for
+each entry point, prints the cumulative import time with the slowest
+dependencies, and fails when a lightweight entry point pulls in a heavy
+dependency that should only load on first use.
+
+    python -m deep_research.test_import_time [--top 8]
+    python -m pytest deep_research/test_import_time.py
+"""
+import argparse
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Entry point -> heavy top-level packages it must not import
+ENTRY_POINTS: Dict[str, Tuple[str, ...]] = {
+    "deep_research.config": ("langchain_core", "langgraph", "tavily"),
+    "deep_research.main": ("langchain_core", "langchain_openai", "langgraph", "tavily"),
+    "deep_research.tools.search": ("langchain_openai", "langgraph", "tavily"),
+    "deep_research.llm": ("langchain_openai", "tavily"),
+    "deep_research.graph": ("langchain_openai", "tavily"),
+}
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """(module, cumulative us, nesting depth) for every import done by `import module`"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            rows.append((name, int(cumulative), (len(indent) - 1) // 2))
+    return rows
+
+
+def heavy_imports(module: str, rows: List[Tuple[str, int, int]]) -> List[str]:
+    """Forbidden packages that importing `module` loaded"""
+    loaded = {name.split(".")[0] for name, _, _ in rows}
+    return [package for package in ENTRY_POINTS[module] if package in loaded]
+
+
+def test_entry_points_avoid_heavy_imports():
+    violations = [
+        f"{module} imports {package}"
+        for module in ENTRY_POINTS
+        for package in heavy_imports(module, import_times(module))
+    ]
+    assert not violations, "Heavy imports on the cold-start path: " + ", ".join(violations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top", type=int, default=8, help="Slowest direct imports to list per entry point")
+    args = parser.parse_args()
+
+    violations = []
+    for module in ENTRY_POINTS:
+        rows = import_times(module)
+        # Nested imports are reported before the module that triggered them
+        end = next(i for i, row in enumerate(rows) if row[0] == module and row[2] == 0)
+        start = end
+        while start > 0 and rows[start - 1][2] > 0:
+            start -= 1
+        print(f"\n{module}: {rows[end][1] / 1000:.1f}ms")
+
+        children = [row for row in rows[start:end] if row[2] == 1]
+        for name, cumulative, _ in sorted(children, key=lambda row: -row[1])[:args.top]:
+            print(f"  {cumulative / 1000:8.1f}ms  {name}")
+
+        for package in heavy_imports(module, rows):
+            violations.append(f"{module} imports {package}")
+
+    if violations:
+        print("\n❌ Heavy imports on the cold-start path:")
+        for violation in violations:
+            print(f"  - {violation}")
+        sys.exit(1)
+    print("\n✅ No heavy imports on the cold-start path")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Record/replay round-trips through the cassette
+
+    python -m pytest deep_research/test_replay.py
+"""
+import asyncio
+
+from deep_research import config, replay
+from deep_research.replay import RecordingTavilyClient, ReplayTavilyClient
+
+
+class EchoingTavily:
+    """Live stand-in that echoes each URL back with a trailing slash"""
+
+    async def extract(self, urls, **kwargs):
+        return {"results": [{"url": url + "/", "raw_content": f"page at {url}"} for url in urls],
+                "failed_results": []}
+
+
+def test_extract_replays_when_tavily_echoes_a_url_variant(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "REPLAY_CASSETTE", str(tmp_path / "cassette.json"))
+    monkeypatch.setattr(config, "REPLAY_ON_MISS", "error")
+    monkeypatch.setattr(replay, "_cassette", None)
+    url = "https://example.com/article"
+
+    async def run():
+        await RecordingTavilyClient(EchoingTavily()).extract(urls=[url])
+        replay.get_cassette().save()
+        monkeypatch.setattr(replay, "_cassette", None)
+        return await ReplayTavilyClient().extract(urls=[url])
+
+    response = asyncio.run(run())
+    assert response["failed_results"] == []
+    assert response["results"][0]["raw_content"] == f"page at {url}"
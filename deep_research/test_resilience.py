@@ -0,0 +1,256 @@
+"""
+Circuit breaker, retry and hedging behavior of call_with_resilience
+
+    python -m pytest deep_research/test_resilience.py
+"""
+import asyncio
+import time
+
+from deep_research import resilience
+from deep_research.resilience import CircuitBreaker, CircuitOpenError, call_with_resilience
+
+
+def open_breaker(provider: str, reset_timeout: float = 0.05) -> CircuitBreaker:
+    breaker = CircuitBreaker(provider, failure_threshold=1, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    resilience._breakers[provider] = breaker
+    return breaker
+
+
+def test_cancelled_half_open_trial_admits_next_call():
+    async def run():
+        breaker = open_breaker("test_cancelled_trial")
+        await asyncio.sleep(0.06)
+        assert breaker.state == "half_open"
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        trial = asyncio.ensure_future(
+            call_with_resilience("test_cancelled_trial", hang, timeout=5, attempts=1)
+        )
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        try:
+            await trial
+        except asyncio.CancelledError:
+            pass
+
+        async def ok():
+            return "ok"
+
+        assert await call_with_resilience("test_cancelled_trial", ok, timeout=1, attempts=1) == "ok"
+        assert breaker.state == "closed"
+
+    asyncio.run(run())
+
+
+def test_open_breaker_short_circuits():
+    async def run():
+        open_breaker("test_open", reset_timeout=60)
+
+        async def ok():
+            return "ok"
+
+        try:
+            await call_with_resilience("test_open", ok, timeout=1, attempts=1)
+        except CircuitOpenError as e:
+            assert e.retry_in > 0
+        else:
+            raise AssertionError("call went through an open breaker")
+
+    asyncio.run(run())
+
+
+def test_only_one_half_open_trial():
+    breaker = open_breaker("test_single_trial", reset_timeout=0.0)
+    time.sleep(0.001)
+    assert breaker.before_call() is True
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        pass
+    else:
+        raise AssertionError("a second trial was admitted")
+    breaker.release_trial()
+    assert breaker.before_call() is True
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_transient_classification():
+    assert resilience.is_transient(asyncio.TimeoutError())
+    assert resilience.is_transient(ConnectionError())
+    assert resilience.is_transient(StatusError(429))
+    assert resilience.is_transient(StatusError(503))
+    assert not resilience.is_transient(StatusError(400))
+    assert not resilience.is_transient(StatusError(401))
+    assert not resilience.is_transient(ValueError("bad JSON"))
+
+
+def test_client_errors_are_not_retried_or_counted():
+    async def run():
+        calls = 0
+
+        async def bad_request():
+            nonlocal calls
+            calls += 1
+            raise StatusError(400)
+
+        breaker = resilience.CircuitBreaker("test_client_error", failure_threshold=1)
+        resilience._breakers["test_client_error"] = breaker
+        for _ in range(3):
+            try:
+                await call_with_resilience("test_client_error", bad_request, timeout=1, attempts=3)
+            except resilience.UpstreamError as e:
+                assert isinstance(e.cause, StatusError)
+        assert calls == 3
+        assert breaker.state == "closed"
+
+    asyncio.run(run())
+
+
+def test_client_errors_do_not_reset_the_failure_count():
+    async def run():
+        responses = iter([StatusError(503), StatusError(400), StatusError(503)])
+
+        async def flaky():
+            raise next(responses)
+
+        breaker = resilience.CircuitBreaker("test_alternating", failure_threshold=2)
+        resilience._breakers["test_alternating"] = breaker
+        for _ in range(3):
+            try:
+                await call_with_resilience("test_alternating", flaky, timeout=1, attempts=1)
+            except resilience.UpstreamError:
+                pass
+        assert breaker.state == "open"
+
+    asyncio.run(run())
+
+
+def test_transient_errors_are_retried_and_open_the_breaker():
+    async def run():
+        calls = 0
+
+        async def unavailable():
+            nonlocal calls
+            calls += 1
+            raise StatusError(503)
+
+        breaker = resilience.CircuitBreaker("test_server_error", failure_threshold=2)
+        resilience._breakers["test_server_error"] = breaker
+        try:
+            await call_with_resilience("test_server_error", unavailable, timeout=1, attempts=2)
+        except resilience.UpstreamError:
+            pass
+        assert calls == 2
+        assert breaker.state == "open"
+
+    asyncio.run(run())
+
+
+def run_observer_with_fake_models(parse_failures: set):
+    """run_structured("observer") against fake chains; models in `parse_failures` return invalid output"""
+    from langchain_core.prompts import ChatPromptTemplate
+
+    from deep_research import llm
+    from deep_research.output_schemas import ResearchEvaluation
+
+    evaluation = ResearchEvaluation(is_complete=True, confidence=0.9, gaps=[], suggested_follow_ups=[])
+
+    class FakeChain:
+        def __init__(self, model):
+            self.model = model
+
+        async def ainvoke(self, messages):
+            if self.model in parse_failures:
+                return {"raw": None, "parsed": None, "parsing_error": "not JSON"}
+            return {"raw": None, "parsed": evaluation, "parsing_error": None}
+
+    async def run():
+        original = llm.get_structured_llm
+        llm.get_structured_llm = lambda route, schema=None, model=None: FakeChain(model)
+        try:
+            prompt = ChatPromptTemplate.from_messages([("human", "{q}")])
+            return await llm.run_structured("observer", prompt, {"q": "test"})
+        finally:
+            llm.get_structured_llm = original
+
+    assert asyncio.run(run()) == evaluation
+
+
+def test_fallback_model_survives_primary_breaker():
+    from deep_research import config
+
+    primary = config.LLM_ROLES["observer"]["model"]
+    open_breaker(f"llm:{primary}", reset_timeout=60)
+    try:
+        run_observer_with_fake_models(parse_failures=set())
+    finally:
+        resilience._breakers.pop(f"llm:{primary}", None)
+
+
+def test_parse_failures_fall_back_without_opening_breaker():
+    from deep_research import config
+
+    primary = config.LLM_ROLES["observer"]["model"]
+    for _ in range(config.BREAKER_FAILURE_THRESHOLD + 1):
+        run_observer_with_fake_models(parse_failures={primary})
+    assert resilience.get_breaker(f"llm:{primary}").state == "closed"
+
+
+def test_queue_wait_does_not_count_against_deadline_or_hedge():
+    from deep_research.limits import ProviderLimiter
+
+    async def run():
+        limiter = ProviderLimiter("test_queue", concurrency=1)
+        stats_key = "test_queue"
+        calls = 0
+
+        async def slow_upstream():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.15)
+            return "ok"
+
+        # Two requests share one slot: the second queues for ~0.15s, longer
+        # than its 0.1s hedge delay but within its 0.2s deadline once dispatched
+        results = await asyncio.gather(*[
+            call_with_resilience(stats_key, slow_upstream, timeout=0.2, attempts=1,
+                                 hedge_after=0.1, limiter=limiter)
+            for _ in range(2)
+        ])
+        assert results == ["ok", "ok"]
+        # Each original hit the hedge delay with the only slot taken, so no hedges were sent
+        assert calls == 2
+        assert resilience._get_stats(stats_key).hedges == 0
+        assert limiter.stats.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_hedge_is_sent_when_a_slot_is_free():
+    from deep_research.limits import ProviderLimiter
+
+    async def run():
+        limiter = ProviderLimiter("test_hedge", concurrency=2)
+        calls = 0
+
+        async def first_slow():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.3 if calls == 1 else 0.01)
+            return calls
+
+        result = await call_with_resilience("test_hedge", first_slow, timeout=1, attempts=1,
+                                            hedge_after=0.05, limiter=limiter)
+        assert result == 2
+        assert resilience._get_stats("test_hedge").hedges == 1
+        assert limiter.stats.in_flight == 0
+
+    asyncio.run(run())
@@ -0,0 +1,106 @@
+"""
+Adaptive search: budget charging and escalation thresholds
+
+    python -m pytest deep_research/test_search_policy.py
+"""
+import asyncio
+
+from deep_research import config
+from deep_research.tools import search
+from deep_research.tools.cache import MemoryCache, set_cache
+from deep_research.tools.search_policy import (
+    SearchBudgetExhausted,
+    SearchPolicy,
+    adaptive_search,
+    metered_searches,
+    search_policy,
+)
+
+
+class FakeTavily:
+    def __init__(self, score: float = 0.9):
+        self.score = score
+        self.calls = 0
+
+    async def search(self, query, max_results, search_depth, include_raw_content):
+        self.calls += 1
+        return {"results": [{"title": query, "url": f"https://example.com/{self.calls}",
+                             "content": query, "score": self.score}]}
+
+
+def use_fakes(score: float = 0.9) -> FakeTavily:
+    client = FakeTavily(score)
+    search._tavily_client = client
+    set_cache("search", MemoryCache())
+    set_cache("search_stats", MemoryCache())
+    search_policy.clear()
+    return client
+
+
+def teardown_function(function) -> None:
+    search._tavily_client = None
+    set_cache("search", MemoryCache())
+    search_policy.clear()
+
+
+def test_cached_searches_are_not_charged():
+    client = use_fakes()
+
+    async def run():
+        with metered_searches(limit=1) as budget:
+            await adaptive_search("rust memory safety")
+            # Served from the search cache, so it fits in a used-up budget
+            await adaptive_search("rust memory safety")
+            assert budget.used == 1
+            try:
+                await adaptive_search("go garbage collector")
+            except SearchBudgetExhausted:
+                pass
+            else:
+                raise AssertionError("an uncached search went over budget")
+
+    asyncio.run(run())
+    assert client.calls == 1
+    assert search_policy.stats.cached == 1
+    assert search_policy.stats.over_budget == 1
+
+
+def test_coalesced_searches_are_charged_once():
+    client = use_fakes()
+
+    async def run():
+        with metered_searches(limit=5) as budget:
+            await asyncio.gather(*[adaptive_search("rust memory safety") for _ in range(3)])
+            return budget.used
+
+    assert asyncio.run(run()) == 1
+    assert client.calls == 1
+
+
+def record_samples(policy: SearchPolicy, score: float, query_coverage: float) -> None:
+    for _ in range(config.SEARCH_STATS_MIN_SAMPLES):
+        policy.record(score, query_coverage)
+
+
+def test_thresholds_follow_recorded_scores_both_ways():
+    use_fakes()
+    policy = SearchPolicy()
+    assert policy.thresholds() == (config.SEARCH_MIN_SCORE, config.SEARCH_MIN_COVERAGE)
+
+    record_samples(policy, 0.7, 0.8)
+    assert policy.thresholds() == (0.7, 0.8)
+
+    policy.clear()
+    record_samples(policy, 0.3, 0.4)
+    assert policy.thresholds() == (0.3, 0.4)
+
+
+def test_thresholds_stay_within_bounds():
+    use_fakes()
+    policy = SearchPolicy()
+    record_samples(policy, 1.0, 1.0)
+    assert policy.thresholds() == (config.SEARCH_SCORE_BOUNDS[1], config.SEARCH_COVERAGE_BOUNDS[1])
+
+    policy.clear()
+    record_samples(policy, 0.0, 0.0)
+    assert policy.thresholds() == (config.SEARCH_SCORE_BOUNDS[0], config.SEARCH_COVERAGE_BOUNDS[0])
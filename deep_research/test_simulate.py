@@ -0,0 +1,189 @@
+"""
+End-to-end behavior against simulated providers (DEEP_RESEARCH_REPLAY=simulate)
+
+No API keys or network are needed: Tavily and LLM responses are synthetic
+and deterministic, so these assert on what the pipeline does rather than on
+what it finds.
+
+    python -m pytest deep_research/test_simulate.py
+"""
+import asyncio
+import json
+
+import pytest
+
+from deep_research import checkpoint, config, resilience
+from deep_research.replay import SimulatedTavilyClient
+from deep_research.tools import blobs, search
+from deep_research.tools.cache import MemoryCache, set_cache
+from deep_research.tools.search_policy import search_policy
+
+QUERY = "What are the key differences between Rust and Go for systems programming?"
+
+
+class CountingTavily(SimulatedTavilyClient):
+    def __init__(self):
+        self.searches = 0
+        self.extracts = 0
+
+    async def search(self, *args, **kwargs):
+        self.searches += 1
+        return await super().search(*args, **kwargs)
+
+    async def extract(self, *args, **kwargs):
+        self.extracts += 1
+        return await super().extract(*args, **kwargs)
+
+
+@pytest.fixture
+def tavily(monkeypatch, tmp_path) -> CountingTavily:
+    """Simulated providers with fresh caches, blob store and checkpoint files"""
+    monkeypatch.setattr(config, "REPLAY_MODE", "simulate")
+    monkeypatch.setattr(config, "CHECKPOINT_PATH", str(tmp_path / "checkpoints.sqlite"))
+    monkeypatch.setattr(config, "BLOB_SPILL_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setattr(checkpoint, "_journal", None)
+    monkeypatch.setattr(blobs, "_store", None)
+    client = CountingTavily()
+    monkeypatch.setattr(search, "_tavily_client", client)
+    for namespace in ("search", "extract", "search_stats"):
+        set_cache(namespace, MemoryCache())
+    search_policy.clear()
+    return client
+
+
+def run_graph(query: str = QUERY, max_iterations: int = 1) -> dict:
+    from deep_research.graph import create_research_graph
+    from deep_research.state import new_research_state
+
+    return asyncio.run(create_research_graph().ainvoke(new_research_state(query, max_iterations)))
+
+
+def test_repeated_query_is_served_from_the_search_cache(tavily):
+    from deep_research.limits import limiter_stats
+
+    first = run_graph()
+    assert first["final_output"]
+    searches = tavily.searches
+    assert searches > 0
+
+    second = run_graph()
+    assert second["final_output"]
+    assert tavily.searches == searches
+    assert second["search_calls_used"] == 0
+    # Every limiter slot taken during the runs was given back
+    assert all(stats["in_flight"] == 0 for stats in limiter_stats().values())
+
+
+def test_search_budget_caps_a_run(tavily, monkeypatch):
+    monkeypatch.setattr(config, "SEARCH_BUDGET", 2)
+    final_state = run_graph()
+    assert final_state["search_calls_used"] == 2
+    assert tavily.searches == 2
+    assert final_state["final_output"]
+    assert search_policy.stats.over_budget > 0
+
+
+def test_batch_writes_one_line_per_query(tavily, tmp_path):
+    from deep_research.main import run_batch
+
+    output = tmp_path / "results.jsonl"
+    records = [{"id": "rust-go", "query": QUERY}, {"id": "wasm", "query": "How mature is WebAssembly outside the browser?"}]
+    counts = asyncio.run(run_batch(records, str(output), concurrency=2, max_iterations=1))
+    assert counts == {"succeeded": 2, "failed": 0}
+
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(r["id"] for r in results) == ["rust-go", "wasm"]
+    for result in results:
+        assert result["ok"]
+        assert result["final_output"]
+        assert result["search_calls_used"] > 0
+
+
+def test_resume_after_writer_failure_skips_finished_nodes(tavily, monkeypatch):
+    from deep_research import graph
+    from deep_research.agents.writer import writer_node
+
+    calls = {"writer": 0}
+
+    async def flaky_writer(state):
+        calls["writer"] += 1
+        if calls["writer"] == 1:
+            raise RuntimeError("writer crashed")
+        return await writer_node(state)
+
+    monkeypatch.setattr(graph, "writer_node", flaky_writer)
+
+    async def run():
+        async with checkpoint.open_checkpointer() as saver:
+            app = graph.create_research_graph(saver)
+            with pytest.raises(RuntimeError):
+                await checkpoint.run_research(app, QUERY, "resume-test", max_iterations=1)
+            searches = tavily.searches
+            final_state = await checkpoint.run_research(app, QUERY, "resume-test", max_iterations=1)
+            # Planner, executor and observer were restored, not re-run
+            assert tavily.searches == searches
+            return final_state
+
+    final_state = asyncio.run(run())
+    assert final_state["final_output"]
+    assert calls["writer"] == 2
+
+
+def test_breaker_recovers_through_a_half_open_trial(tavily, monkeypatch):
+    breaker = resilience.CircuitBreaker("tavily_search", failure_threshold=2, reset_timeout=0.1)
+    monkeypatch.setitem(resilience._breakers, "tavily_search", breaker)
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0.0)
+    monkeypatch.setattr(config, "REPLAY_ERROR_RATE", {**config.REPLAY_ERROR_RATE, "tavily_search": 1.0})
+
+    async def run():
+        with pytest.raises(resilience.UpstreamError):
+            await search.tavily_search("rust ownership")
+        assert breaker.state == "open"
+        with pytest.raises(resilience.CircuitOpenError):
+            await search.tavily_search("go scheduler")
+
+        monkeypatch.setattr(config, "REPLAY_ERROR_RATE", {**config.REPLAY_ERROR_RATE, "tavily_search": 0.0})
+        await asyncio.sleep(0.15)
+        assert breaker.state == "half_open"
+        assert await search.tavily_search("go scheduler")
+        assert breaker.state == "closed"
+
+    asyncio.run(run())
+
+
+def test_server_streams_a_job_and_turns_away_overflow(tavily, monkeypatch):
+    from aiohttp.test_utils import TestClient, TestServer
+
+    from deep_research.main import create_server
+
+    # Slow enough that the first job is still running when the second arrives
+    monkeypatch.setattr(config, "REPLAY_LATENCY", {**config.REPLAY_LATENCY, "llm": 0.05})
+
+    async def read_events(response) -> list:
+        events = []
+        async for line in response.content:
+            line = line.decode().strip()
+            if line.startswith("event: "):
+                events.append(line[len("event: "):])
+        return events
+
+    async def run():
+        async with TestClient(TestServer(create_server(max_jobs=1, queue_size=0))) as client:
+            first = await client.post("/research", json={"query": QUERY, "max_iterations": 1})
+            assert first.status == 200
+            assert first.headers["Content-Type"] == "text/event-stream"
+
+            busy = await client.post("/research", json={"query": "another query"})
+            assert busy.status == 503
+            assert busy.headers["Retry-After"]
+            assert (await busy.json())["running"] == 1
+
+            events = await read_events(first)
+            assert events[0] == "queued"
+            assert "report" in events
+            assert events[-1] == "done"
+
+            health = await (await client.get("/health")).json()
+            assert health["running"] == 0
+
+    asyncio.run(run())
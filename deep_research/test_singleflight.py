@@ -0,0 +1,49 @@
+"""
+Request coalescing: followers of a cancelled leader still get a result
+
+    python -m pytest deep_research/test_singleflight.py
+"""
+import asyncio
+
+from deep_research.tools.utils import SingleFlight
+
+
+def test_follower_survives_leader_cancellation():
+    async def run():
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "page"
+
+        leader = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.ensure_future(flight.do("key", fetch)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await asyncio.gather(*followers) == ["page", "page"]
+        assert leader.cancelled()
+        # One follower took over the call and the other joined it
+        assert calls == 2
+        assert not flight.in_flight("key")
+
+    asyncio.run(run())
+
+
+def test_followers_share_the_leaders_failure():
+    async def run():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream down")
+
+        results = await asyncio.gather(*[flight.do("key", fail) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert flight.stats()["calls"] == 1
+
+    asyncio.run(run())
@@ -0,0 +1,71 @@
+"""
+Streaming executor: early evaluation and its hand-off to the observer
+
+    python -m pytest deep_research/test_streaming.py
+"""
+import asyncio
+
+from deep_research.agents import executor, observer
+from deep_research.state import new_research_state
+
+# Half of the first wave finishes well before the rest
+TASK_DELAYS = {"task_0": 0.01, "task_1": 0.02, "task_2": 0.2, "task_3": 0.2}
+
+
+def make_state() -> dict:
+    state = new_research_state("test query", max_iterations=2)
+    state["tasks"] = [
+        {"task_id": f"task_{i}", "description": f"task {i}", "search_queries": [],
+         "output_schema": {}, "status": "pending"}
+        for i in range(4)
+    ]
+    return state
+
+
+def use_fakes(monkeypatch, verdict: dict) -> list:
+    """Fake tasks and an observer returning `verdict`; returns the result count of each evaluation"""
+    evaluated = []
+
+    async def run_task(task, state):
+        await asyncio.sleep(TASK_DELAYS.get(task["task_id"], 0.01))
+        return {"task_id": task["task_id"], "search_results": [], "reasoning": "", "structured_output": {},
+                "citations": [], "key_insights": [], "errors": []}
+
+    async def evaluate(query, research_plan, task_results, iteration_count):
+        evaluated.append(len(task_results))
+        return verdict
+
+    monkeypatch.setattr(executor, "run_task", run_task)
+    monkeypatch.setattr(observer, "evaluate_research_completeness", evaluate)
+    return evaluated
+
+
+def test_complete_early_verdict_is_not_evaluated_again(monkeypatch):
+    evaluated = use_fakes(monkeypatch, {"is_complete": True, "confidence": 0.9, "gaps": [], "follow_up_tasks": []})
+    state = make_state()
+
+    update = asyncio.run(executor.execute_tasks_streaming(state["tasks"], state))
+    assert update["early_verdict"]["is_complete"]
+    assert len(update["task_results"]) == len(TASK_DELAYS)
+
+    result = asyncio.run(observer.observer_node({**state, **update}))
+    assert result["research_complete"]
+    assert result["early_verdict"] == {}
+    # Only the early evaluation of the first two results ran
+    assert evaluated == [2]
+
+
+def test_early_gaps_are_evaluated_again_after_follow_ups(monkeypatch):
+    follow_up = {"task_id": "followup_1_1", "description": "gap", "search_queries": ["gap"],
+                 "output_schema": {}, "status": "pending"}
+    evaluated = use_fakes(monkeypatch, {"is_complete": False, "confidence": 0.3, "gaps": ["gap"],
+                                        "follow_up_tasks": [follow_up]})
+    state = make_state()
+
+    update = asyncio.run(executor.execute_tasks_streaming(state["tasks"], state))
+    assert update["early_verdict"] == {}
+    assert update["iteration_count"] == 1
+    assert len(update["task_results"]) == 5
+
+    asyncio.run(observer.observer_node({**state, **update}))
+    assert evaluated == [2, 5]
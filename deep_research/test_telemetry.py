@@ -0,0 +1,57 @@
+"""
+Span bookkeeping: bounded latency samples and reset while spans are open
+
+    python -m pytest deep_research/test_telemetry.py
+"""
+import asyncio
+
+from deep_research import config, telemetry
+
+
+def with_telemetry(fn):
+    def run():
+        enabled = config.TELEMETRY_ENABLED
+        config.TELEMETRY_ENABLED = True
+        telemetry.reset()
+        try:
+            fn()
+        finally:
+            telemetry.reset()
+            config.TELEMETRY_ENABLED = enabled
+    run.__name__ = fn.__name__
+    return run
+
+
+@with_telemetry
+def test_samples_are_bounded_but_counts_exact():
+    async def run():
+        for _ in range(config.TELEMETRY_MAX_SAMPLES + 50):
+            async with telemetry.span("test.bounded"):
+                pass
+
+    asyncio.run(run())
+    assert len(telemetry._samples["test.bounded"]) == config.TELEMETRY_MAX_SAMPLES
+    assert telemetry.latency_report()["test.bounded"]["count"] == config.TELEMETRY_MAX_SAMPLES + 50
+
+
+@with_telemetry
+def test_reset_keeps_open_spans_in_flight():
+    async def run():
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def long_span():
+            async with telemetry.span("test.open"):
+                started.set()
+                await release.wait()
+
+        task = asyncio.ensure_future(long_span())
+        await started.wait()
+        telemetry.reset()
+        assert telemetry._in_flight["test.open"] == 1
+        release.set()
+        await task
+        assert telemetry._in_flight["test.open"] == 0
+        assert telemetry.latency_report()["test.open"]["max_in_flight"] == 1
+
+    asyncio.run(run())
@@ -0,0 +1,30 @@
+"""
+Writer settings that are read per call
+
+    python -m pytest deep_research/test_writer.py
+"""
+import asyncio
+
+from deep_research import config
+from deep_research.agents import writer
+from deep_research.state import new_research_state
+
+
+def test_streaming_can_be_turned_on_after_import(monkeypatch):
+    used = []
+
+    async def stream_report(prompt, inputs):
+        used.append("stream")
+
+    async def run_structured(role, prompt, inputs):
+        used.append("single")
+
+    monkeypatch.setattr(writer, "stream_report", stream_report)
+    monkeypatch.setattr(writer, "run_structured", run_structured)
+    state = new_research_state("test query")
+
+    monkeypatch.setattr(config, "WRITER_STREAM", False)
+    asyncio.run(writer.write_report(state, "context"))
+    monkeypatch.setattr(config, "WRITER_STREAM", True)
+    asyncio.run(writer.write_report(state, "context"))
+    assert used == ["single", "stream"]
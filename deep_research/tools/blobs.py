@@ -0,0 +1,315 @@
+"""
+Content-addressed store for page text
+
+Search snippets and extracted pages are stored once, keyed by the SHA-256
+of their text, and the graph state only carries "sha256:<hex>" references.
+Identical content fetched by different tasks or concurrent runs is held
+once. Blobs are kept in memory up to BLOB_MEMORY_LIMIT bytes; beyond that
+the least recently used ones spill to files under BLOB_SPILL_DIR and are
+read back on demand.
+
+Blobs stored inside blob_scope() belong to that run and are dropped (from
+memory and disk) once no running scope holds them. Blobs stored outside any
+scope (e.g. a direct app.ainvoke) are never released, so they are evicted
+first: without a spill directory the least recently used of them are
+dropped once memory is over the limit. Spilled files are evicted past
+BLOB_DISK_LIMIT bytes, unheld ones before held ones and each oldest first,
+and files left by earlier processes are removed after BLOB_DISK_TTL.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, Optional, Set
+
+from deep_research import config
+from deep_research.tools.dedup import simhash
+
+REF_PREFIX = "sha256:"
+
+_owner: ContextVar[Optional[str]] = ContextVar("blob_owner", default=None)
+
+
+class BlobNotFound(KeyError):
+    pass
+
+
+@dataclass
+class BlobStats:
+    puts: int = 0
+    deduplicated: int = 0
+    spilled: int = 0
+    disk_reads: int = 0
+    released: int = 0
+    evicted: int = 0
+    memory_bytes: int = 0
+    disk_bytes: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class BlobStore:
+    def __init__(
+        self,
+        memory_limit: int,
+        spill_dir: Optional[str] = None,
+        disk_limit: int = config.BLOB_DISK_LIMIT,
+        disk_ttl: float = config.BLOB_DISK_TTL
+    ):
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.disk_limit = disk_limit
+        self.disk_ttl = disk_ttl
+        self.stats = BlobStats()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        # digest -> size of spilled files, least recently used first
+        self._on_disk: "OrderedDict[str, int]" = OrderedDict()
+        self._holders: Dict[str, Set[str]] = {}
+        self._held: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._adopt_spilled_files()
+
+    def put(self, text: str, owner: Optional[str] = None) -> str:
+        """Store text, held by `owner` (default: the enclosing blob_scope) until released"""
+        owner = owner or _owner.get()
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self.stats.puts += 1
+            if digest in self._memory:
+                self._memory.move_to_end(digest)
+                self.stats.deduplicated += 1
+            elif digest in self._on_disk:
+                self._on_disk.move_to_end(digest)
+                self.stats.deduplicated += 1
+            else:
+                self._memory[digest] = data
+                self.stats.memory_bytes += len(data)
+                self._spill()
+            if owner:
+                self._holders.setdefault(digest, set()).add(owner)
+                self._held.setdefault(owner, set()).add(digest)
+        return REF_PREFIX + digest
+
+    def get(self, ref: str) -> str:
+        digest = ref[len(REF_PREFIX):] if ref.startswith(REF_PREFIX) else ref
+        with self._lock:
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+                return data.decode("utf-8")
+            if digest in self._on_disk:
+                self._on_disk.move_to_end(digest)
+            self.stats.disk_reads += 1
+        if not self.spill_dir:
+            raise BlobNotFound(ref)
+        try:
+            with open(self._path(digest), "rb") as f:
+                return f.read().decode("utf-8")
+        except FileNotFoundError:
+            raise BlobNotFound(ref) from None
+
+    def release(self, owner: str, persist: bool = False) -> int:
+        """
+        Drop `owner`'s hold on its blobs
+
+        Blobs nobody else holds are deleted, or with `persist` moved to the
+        spill directory, where only the disk limit and TTL reclaim them.
+        """
+        dropped = 0
+        with self._lock:
+            for digest in self._held.pop(owner, ()):
+                holders = self._holders.get(digest)
+                if holders:
+                    holders.discard(owner)
+                if holders:
+                    continue
+                self._holders.pop(digest, None)
+                if persist and self.spill_dir:
+                    data = self._memory.pop(digest, None)
+                    if data is not None:
+                        self._write(digest, data)
+                else:
+                    self._drop(digest)
+                    dropped += 1
+            self.stats.released += dropped
+            self._evict_disk()
+        return dropped
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.spill_dir, digest[:2], digest)
+
+    def _drop(self, digest: str) -> None:
+        data = self._memory.pop(digest, None)
+        if data is not None:
+            self.stats.memory_bytes -= len(data)
+        size = self._on_disk.pop(digest, None)
+        if size is not None:
+            self.stats.disk_bytes -= size
+            try:
+                os.remove(self._path(digest))
+            except FileNotFoundError:
+                pass
+
+    def _spill(self) -> None:
+        """Move least recently used blobs to disk until memory is under the limit"""
+        if not self.spill_dir:
+            self._evict_memory()
+            return
+        while self.stats.memory_bytes > self.memory_limit and len(self._memory) > 1:
+            digest, data = self._memory.popitem(last=False)
+            self._write(digest, data)
+        self._evict_disk()
+
+    def _evict_memory(self) -> None:
+        """With nowhere to spill, drop least recently used unheld blobs (never the newest)"""
+        if self.stats.memory_bytes <= self.memory_limit:
+            return
+        newest = next(reversed(self._memory), None)
+        for digest in [d for d in self._memory if d not in self._holders and d != newest]:
+            if self.stats.memory_bytes <= self.memory_limit:
+                break
+            self._drop(digest)
+            self.stats.evicted += 1
+
+    def _write(self, digest: str, data: bytes) -> None:
+        """Move a blob that was just taken out of memory to disk"""
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        if digest not in self._on_disk:
+            self._on_disk[digest] = len(data)
+            self.stats.disk_bytes += len(data)
+        self.stats.memory_bytes -= len(data)
+        self.stats.spilled += 1
+
+    def _evict_disk(self) -> None:
+        if self.stats.disk_bytes <= self.disk_limit:
+            return
+        unheld = [d for d in self._on_disk if d not in self._holders]
+        held = [d for d in self._on_disk if d in self._holders]
+        for digest in unheld + held:
+            if self.stats.disk_bytes <= self.disk_limit:
+                break
+            self._drop(digest)
+            self.stats.evicted += 1
+
+    def _adopt_spilled_files(self) -> None:
+        """Track files spilled by earlier processes, deleting those past the TTL"""
+        cutoff = time.time() - self.disk_ttl
+        found = []
+        for directory, _, names in os.walk(self.spill_dir):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    info = os.stat(path)
+                    if info.st_mtime < cutoff:
+                        os.remove(path)
+                    elif len(name) == 64:
+                        found.append((info.st_mtime, name, info.st_size))
+                except FileNotFoundError:
+                    continue
+        with self._lock:
+            for _, digest, size in sorted(found):
+                self._on_disk[digest] = size
+                self.stats.disk_bytes += size
+            self._evict_disk()
+
+    def clear(self) -> None:
+        """Forget every blob, deleting the spilled files"""
+        with self._lock:
+            for digest in list(self._on_disk):
+                self._drop(digest)
+            self._memory.clear()
+            self._holders.clear()
+            self._held.clear()
+            self.stats.memory_bytes = 0
+            self.stats.disk_bytes = 0
+
+
+@contextmanager
+def blob_scope(keep_on_error: bool = False) -> Iterator[str]:
+    """
+    Make blobs stored inside the block (including child tasks) belong to one run
+
+    They are released when the block exits; with `keep_on_error` a run that
+    fails moves them to the spill directory instead, so a checkpointed
+    thread can resume with its page text.
+    """
+    owner = uuid.uuid4().hex
+    token = _owner.set(owner)
+    try:
+        yield owner
+    except BaseException:
+        get_blob_store().release(owner, persist=keep_on_error)
+        raise
+    else:
+        get_blob_store().release(owner)
+    finally:
+        _owner.reset(token)
+
+
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = BlobStore(config.BLOB_MEMORY_LIMIT, config.BLOB_SPILL_DIR)
+    return _store
+
+
+def externalize_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Search result as stored in the graph state
+
+    'content' and 'raw_content' are replaced by 'content_ref' /
+    'raw_content_ref' plus their lengths; everything else is kept. The
+    content's SimHash is stored too, so results can be deduplicated without
+    loading their text back.
+    """
+    stored = {k: v for k, v in result.items() if k not in ("content", "raw_content")}
+    stored["simhash"] = simhash(result.get("content") or "")
+    for field in ("content", "raw_content"):
+        text = result.get(field)
+        if text:
+            stored[f"{field}_ref"] = get_blob_store().put(text)
+            stored[f"{field}_chars"] = len(text)
+    return stored
+
+
+def resolve_result(stored: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Inverse of externalize_result: load the referenced text back in
+
+    A state restored from a checkpoint can outlive blobs that were never
+    spilled to disk; their text comes back empty.
+    """
+    result = {k: v for k, v in stored.items() if not k.endswith(("_ref", "_chars"))}
+    for field in ("content", "raw_content"):
+        ref = stored.get(f"{field}_ref")
+        try:
+            result[field] = get_blob_store().get(ref) if ref else result.get(field, "")
+        except BlobNotFound:
+            result[field] = ""
+    return result
+
+
+def blob_stats() -> Dict[str, int]:
+    return get_blob_store().stats.as_dict()
@@ -0,0 +1,261 @@
+"""
+TTL caches for search and extraction results
+
+Backends are pluggable: an in-memory LRU, a SQLite store that survives across
+runs, or both tiered with memory in front. Each namespace ("search",
+"extract", ...) gets its own cache instance and its own counters.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from deep_research import config
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class CacheBackend(ABC):
+    """Key/value store with per-entry TTL. Values must be JSON-serializable."""
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        return None if entry is None else entry[1]
+
+    @abstractmethod
+    def get_entry(self, key: str) -> Optional[Tuple[float, Any]]:
+        """Return (expires_at, value) for a live entry, or None"""
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class NullCache(CacheBackend):
+    """Caching disabled: every lookup is a miss"""
+
+    def get_entry(self, key: str) -> Optional[Tuple[float, Any]]:
+        self.stats.misses += 1
+        return None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """Bounded LRU held in process memory"""
+
+    def __init__(self, max_entries: int = config.CACHE_MAX_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_entry(self, key: str) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(CacheBackend):
+    """On-disk store shared by every run that points at the same file"""
+
+    def __init__(
+        self,
+        path: str = config.CACHE_PATH,
+        table: str = "cache",
+        max_entries: int = config.CACHE_MAX_ENTRIES
+    ):
+        super().__init__()
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get_entry(self, key: str) -> Optional[Tuple[float, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            value, expires_at = row
+            if expires_at <= now:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.stats.hits += 1
+        return expires_at, json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        payload = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, payload, now + ttl, now)
+            )
+            count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                )
+                self.stats.evictions += overflow
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+
+class TieredCache(CacheBackend):
+    """Memory LRU in front of a persistent backend"""
+
+    def __init__(self, front: CacheBackend, back: CacheBackend):
+        super().__init__()
+        self.front = front
+        self.back = back
+
+    def get_entry(self, key: str) -> Optional[Tuple[float, Any]]:
+        entry = self.front.get_entry(key)
+        if entry is None:
+            entry = self.back.get_entry(key)
+            if entry is not None:
+                # Promote with whatever lifetime the persistent copy has left
+                expires_at, value = entry
+                self.front.set(key, value, expires_at - time.time())
+        if entry is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        self.stats.evictions = self.front.stats.evictions + self.back.stats.evictions
+        self.stats.expirations = self.front.stats.expirations + self.back.stats.expirations
+        return entry
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.front.set(key, value, ttl)
+        self.back.set(key, value, ttl)
+
+    def clear(self) -> None:
+        self.front.clear()
+        self.back.clear()
+
+
+_caches: Dict[str, CacheBackend] = {}
+_caches_lock = threading.Lock()
+
+
+def create_cache(namespace: str, backend: Optional[str] = None) -> CacheBackend:
+    """Build a cache for a namespace using the named (or configured) backend"""
+    backend = backend or config.CACHE_BACKEND
+    if backend == "memory":
+        return MemoryCache()
+    if backend == "sqlite":
+        return SQLiteCache(table=namespace)
+    if backend == "tiered":
+        return TieredCache(MemoryCache(), SQLiteCache(table=namespace))
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+def get_cache(namespace: str) -> CacheBackend:
+    """Process-wide cache for a namespace, created on first use"""
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = create_cache(namespace)
+            _caches[namespace] = cache
+        return cache
+
+
+def set_cache(namespace: str, cache: CacheBackend) -> None:
+    """Replace the cache used for a namespace"""
+    with _caches_lock:
+        _caches[namespace] = cache
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """Hit/miss/eviction counters for every active namespace"""
+    with _caches_lock:
+        return {name: cache.stats.as_dict() for name, cache in _caches.items()}
@@ -0,0 +1,166 @@
+"""
+URL canonicalization and near-duplicate collapsing for search results
+
+Results are grouped when their canonical URLs match (tracking parameters,
+fragments, www./m. hosts and AMP paths ignored) or when their content
+SimHashes are within DEDUP_SIMHASH_DISTANCE bits. Each group keeps its
+highest-scoring result, and the output is ranked by score with
+first-seen order breaking ties, so citation lists are stable across runs.
+"""
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from deep_research.config import DEDUP_MIN_TOKENS, DEDUP_SIMHASH_DISTANCE
+from deep_research.tools.passages import tokenize
+
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid",
+    "ref", "ref_src", "referrer", "source", "spm", "_hsenc", "_hsmi", "yclid",
+})
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    URL with tracking parameters and the fragment removed
+
+    Scheme and host are lowercased, default ports and a trailing slash are
+    dropped, and the remaining query parameters are sorted. The result still
+    points at the same page, so it is safe to cite and to fetch.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    if not parts.netloc:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or ""
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def url_identity(url: str) -> str:
+    """Key under which mirror URLs of one page collide (not a fetchable URL)"""
+    parts = urlsplit(canonicalize_url(url))
+    host = parts.netloc
+    for prefix in ("www.", "m.", "amp."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    path = parts.path
+    for suffix in ("/amp", "/index.html", "/index.htm"):
+        if path.endswith(suffix):
+            path = path[:-len(suffix)]
+    return f"{host}{path}?{parts.query}" if parts.query else f"{host}{path}"
+
+
+def simhash(text: str, bits: int = 64) -> Optional[int]:
+    """SimHash of the text's word 3-shingles; None if too short to be meaningful"""
+    tokens = tokenize(text)
+    if len(tokens) < DEDUP_MIN_TOKENS:
+        return None
+    weights = [0] * bits
+    for i in range(len(tokens) - 2):
+        shingle = " ".join(tokens[i:i + 3]).encode()
+        h = int.from_bytes(hashlib.blake2b(shingle, digest_size=bits // 8).digest(), "big")
+        for bit in range(bits):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def dedupe_results(results: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Collapse duplicate results, best score first
+
+    Each kept result carries its canonical URL and the highest score in its
+    group. A 'simhash' stored with an externalized result stands in for its
+    content. The input dicts are not modified.
+    """
+    groups, _ = _group_results(results)
+    return [groups[i] for i in _ranked(groups)]
+
+
+def _group_results(results: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Best result per duplicate group, and the group index of every URL identity seen"""
+    groups: List[Dict[str, Any]] = []
+    by_identity: Dict[str, int] = {}
+    fingerprints: List[tuple] = []  # (simhash, group index)
+
+    for result in results:
+        url = result.get('url') or ""
+        identity = url_identity(url) if url else None
+        fingerprint = result['simhash'] if 'simhash' in result else simhash(result.get('content') or "")
+
+        index = by_identity.get(identity) if identity else None
+        if index is None and fingerprint is not None:
+            index = next(
+                (g for h, g in fingerprints if hamming_distance(h, fingerprint) <= DEDUP_SIMHASH_DISTANCE),
+                None
+            )
+
+        score = result.get('score') or 0.0
+        if index is None:
+            index = len(groups)
+            groups.append({**result, 'url': canonicalize_url(url) if url else url, 'score': score})
+        else:
+            best = groups[index]
+            if score > best['score']:
+                groups[index] = {**result, 'url': canonicalize_url(url) if url else url, 'score': score}
+
+        if identity:
+            by_identity.setdefault(identity, index)
+        if fingerprint is not None:
+            fingerprints.append((fingerprint, index))
+
+    return groups, by_identity
+
+
+def _ranked(groups: List[Dict[str, Any]]) -> List[int]:
+    return sorted(range(len(groups)), key=lambda i: (-groups[i]['score'], i))
+
+
+def rank_citations(results: Iterable[Dict[str, Any]], limit: Optional[int] = None) -> List[str]:
+    """Distinct source URLs ranked by score"""
+    urls = [r['url'] for r in dedupe_results(results) if r.get('url')]
+    return urls[:limit] if limit is not None else urls
+
+
+def merge_citations(
+    cited: Iterable[str],
+    results: Iterable[Dict[str, Any]],
+    limit: Optional[int] = None
+) -> List[str]:
+    """
+    Cited URLs without duplicates, best-scoring search results first
+
+    Only URLs in `cited` are returned. Those found among `results` are
+    replaced by the best URL of their duplicate group (mirrors and
+    near-identical pages collapse into one) and ordered by its score; the
+    rest follow in citation order.
+    """
+    groups, by_identity = _group_results(results)
+    rank = {index: position for position, index in enumerate(_ranked(groups))}
+    found: Dict[Any, tuple] = {}
+    for position, url in enumerate(u.strip() for u in cited):
+        if not url:
+            continue
+        identity = url_identity(url)
+        index = by_identity.get(identity)
+        if index is not None and groups[index]['url']:
+            found.setdefault(index, (rank[index], groups[index]['url']))
+        else:
+            found.setdefault(identity, (len(groups) + position, url))
+    urls = [url for _, url in sorted(found.values())]
+    return urls[:limit] if limit is not None else urls
@@ -0,0 +1,128 @@
+"""
+Relevance-ranked passage selection
+
+Search snippets and extracted pages are split into passages, scored with
+BM25 against the task description and its search queries, and the best
+passages are packed into a token budget. Each source's best passage is
+taken first so one long page cannot crowd out every other source, and
+passages sharing no terms with the task are left out.
+"""
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Sequence, Tuple
+
+from deep_research.config import PASSAGE_CHARS
+from deep_research.tools.utils import count_tokens
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have how in is it its of on or that the
+this to was were what when where which who why will with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in _STOPWORDS]
+
+
+def chunk_text(text: str, max_chars: int = PASSAGE_CHARS) -> List[str]:
+    """Split text into passages of whole sentences, at most `max_chars` each"""
+    passages: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        current = ""
+        for sentence in re.split(r"(?<=[.!?])\s+", " ".join(paragraph.split())):
+            while len(sentence) > max_chars:
+                if current:
+                    passages.append(current)
+                    current = ""
+                passages.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            if current and len(current) + len(sentence) + 1 > max_chars:
+                passages.append(current)
+                current = ""
+            current = f"{current} {sentence}".strip()
+        if current:
+            passages.append(current)
+    return passages
+
+
+def bm25_scores(query_terms: Sequence[str], documents: List[List[str]]) -> List[float]:
+    """Okapi BM25 score of every tokenized document for the query terms"""
+    if not documents:
+        return []
+    avg_len = sum(len(d) for d in documents) / len(documents) or 1.0
+    doc_freq = Counter(term for doc in documents for term in set(doc))
+    n = len(documents)
+    idf = {
+        term: math.log(1 + (n - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+        for term in set(query_terms)
+    }
+
+    scores = []
+    for doc in documents:
+        counts = Counter(doc)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / avg_len)
+        scores.append(sum(
+            idf[term] * counts[term] * (BM25_K1 + 1) / (counts[term] + norm)
+            for term in idf if counts[term]
+        ))
+    return scores
+
+
+def select_passages(
+    results: List[Dict[str, Any]],
+    queries: Sequence[str],
+    token_budget: int,
+    passage_chars: int = PASSAGE_CHARS
+) -> List[Dict[str, Any]]:
+    """
+    Keep the passages of `results` most relevant to `queries` within `token_budget`
+
+    Returns copies of the results, in their original order, whose 'content'
+    holds only the selected passages (in page order, joined with " ... ").
+    Results with no selected passage are dropped.
+    """
+    # (result index, passage index, text)
+    passages: List[Tuple[int, int, str]] = []
+    for i, result in enumerate(results):
+        for j, text in enumerate(chunk_text(result.get('content') or "", passage_chars)):
+            passages.append((i, j, text))
+    if not passages:
+        return []
+
+    query_terms = tokenize(" ".join(queries))
+    scores = bm25_scores(query_terms, [tokenize(text) for _, _, text in passages])
+    ranked = sorted(range(len(passages)), key=lambda k: (-scores[k], passages[k][0], passages[k][1]))
+
+    # Passages sharing no terms with the task are noise, unless nothing matches at all
+    if any(scores):
+        ranked = [k for k in ranked if scores[k] > 0]
+
+    # Each source's best passage first, then everything else by score
+    seen_sources = set()
+    leaders, rest = [], []
+    for k in ranked:
+        source = passages[k][0]
+        (rest if source in seen_sources else leaders).append(k)
+        seen_sources.add(source)
+
+    selected = set()
+    used = 0
+    for k in leaders + rest:
+        cost = count_tokens(passages[k][2])
+        if used + cost > token_budget:
+            continue
+        selected.add(k)
+        used += cost
+
+    by_source: Dict[int, List[str]] = {}
+    for k in sorted(selected, key=lambda k: passages[k][:2]):
+        by_source.setdefault(passages[k][0], []).append(passages[k][2])
+
+    return [
+        {**result, 'content': " ... ".join(by_source[i])}
+        for i, result in enumerate(results) if i in by_source
+    ]
@@ -1,8 +1,147 @@
-from tavily import AsyncTavilyClient
-from typing import List, Dict, Any
-from deep_research.config import TAVILY_API_KEY
+import asyncio
+from typing import List, Dict, Any, Optional
+from deep_research import config
+from deep_research.config import (
+    SEARCH_CACHE_TTL,
+    EXTRACT_CACHE_TTL,
+    EXTRACT_BATCH_WINDOW,
+    EXTRACT_BATCH_SIZE
+)
+from deep_research.limits import get_limiter
+from deep_research.replay import wrap_tavily_client
+from deep_research.resilience import call_with_resilience
+from deep_research.telemetry import TAVILY_REQUESTS, span
+from deep_research.tools.cache import get_cache
+from deep_research.tools.dedup import canonicalize_url
+from deep_research.tools.utils import SingleFlight, search_cache_key, extract_cache_key
 
-tavily_client = AsyncTavilyClient(api_key=TAVILY_API_KEY)
+_tavily_client: Optional[Any] = None
+
+
+def get_tavily_client() -> Any:
+    """
+    Shared Tavily client, created on first use
+
+    Swapped for a recording, replaying or simulated stand-in per
+    config.REPLAY_MODE.
+    """
+    global _tavily_client
+    if _tavily_client is None:
+        from tavily import AsyncTavilyClient
+        _tavily_client = wrap_tavily_client(AsyncTavilyClient(api_key=config.TAVILY_API_KEY))
+    return _tavily_client
+
+
+class ExtractionFailed(Exception):
+    """Tavily reported a URL in an extract call as failed"""
+
+    def __init__(self, url: str, reason: str):
+        self.url = url
+        self.reason = reason
+        super().__init__(f"extraction failed for {url}: {reason}")
+
+
+class ExtractBatcher:
+    """
+    Collects extraction requests and sends them as bulk extract calls
+
+    The first URL submitted opens a short window; every URL submitted before
+    it closes (or until the batch is full) goes out in the same request and
+    each waiter gets the content for its own URL. Results are matched on the
+    canonical URL, and a URL Tavily lists under failed_results fails its
+    waiters with ExtractionFailed.
+    """
+
+    def __init__(self, window: float = EXTRACT_BATCH_WINDOW, max_batch: int = EXTRACT_BATCH_SIZE):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: set[asyncio.Task] = set()
+        self.batches = 0
+        self.urls_requested = 0
+
+    async def submit(self, url: str) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(url, []).append(future)
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: Dict[str, List[asyncio.Future]]) -> None:
+        urls = list(batch)
+        self.batches += 1
+        self.urls_requested += len(urls)
+
+        async def call():
+            return await get_tavily_client().extract(urls=urls)
+
+        try:
+            async with span("tavily_extract", urls=len(urls)):
+                response = await call_with_resilience(
+                    "tavily_extract", call, limiter=get_limiter("tavily_extract")
+                )
+        except Exception as e:
+            TAVILY_REQUESTS.inc(operation="extract", outcome="error")
+            print(f"Content extraction error for {len(urls)} URLs: {e}")
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        TAVILY_REQUESTS.inc(operation="extract", outcome="ok")
+        # Tavily may echo a URL back with a trailing slash, reordered query, etc.
+        contents: Dict[str, str] = {}
+        for result in (response or {}).get("results", []):
+            contents[canonicalize_url(result.get("url", ""))] = result.get("raw_content", "") or ""
+        failures: Dict[str, str] = {}
+        for failed in (response or {}).get("failed_results", []):
+            failures[canonicalize_url(failed.get("url", ""))] = failed.get("error", "") or "unknown error"
+
+        for url, futures in batch.items():
+            canonical = canonicalize_url(url)
+            content = contents.get(canonical, "")
+            failure = failures.get(canonical)
+            if content:
+                get_cache("extract").set(extract_cache_key(url), content, EXTRACT_CACHE_TTL)
+            for future in futures:
+                if future.done():
+                    continue
+                if failure is not None and not content:
+                    future.set_exception(ExtractionFailed(url, failure))
+                else:
+                    future.set_result(content)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "batches": self.batches,
+            "urls_requested": self.urls_requested,
+            "pending": len(self._pending)
+        }
+
+
+# Concurrent identical requests share one upstream call
+search_flight = SingleFlight()
+extract_flight = SingleFlight()
+extract_batcher = ExtractBatcher()
 
 
 async def tavily_search(
@@ -22,43 +161,113 @@ async def tavily_search(
     
     Returns:
         List of search results with title, url, content, score
+
+    Raises:
+        UpstreamError: if the search still fails after retries
     """
-    try:
-        response = await tavily_client.search(
+    cache = get_cache("search")
+    key = search_cache_key(query, max_results, search_depth, include_raw_content)
+    cached = cache.get(key)
+    if cached is not None:
+        # Callers mutate result dicts, so never hand out the cached ones
+        return [dict(r) for r in cached]
+
+    results = await search_flight.do(
+        key,
+        lambda: _search(query, max_results, search_depth, include_raw_content, key)
+    )
+    return [dict(r) for r in results]
+
+
+def search_needs_request(
+    query: str,
+    max_results: int = 5,
+    search_depth: str = "basic",
+    include_raw_content: bool = False
+) -> bool:
+    """Whether tavily_search with these arguments would call Tavily, rather than reuse a cached or in-flight search"""
+    key = search_cache_key(query, max_results, search_depth, include_raw_content)
+    return not search_flight.in_flight(key) and get_cache("search").get(key) is None
+
+
+async def _search(
+    query: str,
+    max_results: int,
+    search_depth: str,
+    include_raw_content: bool,
+    cache_key: str
+) -> List[Dict[str, Any]]:
+    async def call():
+        return await get_tavily_client().search(
             query=query,
             max_results=max_results,
             search_depth=search_depth,
             include_raw_content=include_raw_content
         )
-        
-        results = []
-        for result in response.get("results", []):
-            results.append({
-                "title": result.get("title", ""),
-                "url": result.get("url", ""),
-                "content": result.get("content", ""),
-                "score": result.get("score", 0.0),
-                "published_date": result.get("published_date", ""),
-                "raw_content": result.get("raw_content", "") if include_raw_content else ""
-            })
-        
-        return results
-    
+
+    try:
+        async with span("tavily_search", query=query, max_results=max_results, search_depth=search_depth):
+            response = await call_with_resilience("tavily_search", call, limiter=get_limiter("tavily_search"))
     except Exception as e:
+        TAVILY_REQUESTS.inc(operation="search", outcome="error")
         print(f"Search error for query '{query}': {e}")
-        return []
+        raise
+    TAVILY_REQUESTS.inc(operation="search", outcome="ok")
+
+    results = []
+    for result in response.get("results", []):
+        results.append({
+            "title": result.get("title", ""),
+            "url": result.get("url", ""),
+            "content": result.get("content", ""),
+            "score": result.get("score", 0.0),
+            "published_date": result.get("published_date", ""),
+            "raw_content": result.get("raw_content", "") if include_raw_content else ""
+        })
+    
+    get_cache("search").set(cache_key, [dict(r) for r in results], SEARCH_CACHE_TTL)
+    return results
 
 
 async def extract_content(url: str) -> str:
     """
     Extract full page content for a specific URL
     Used when snippets aren't sufficient
+
+    Returns "" when the page has no extractable content; raises
+    ExtractionFailed if Tavily reports the URL as failed, and UpstreamError
+    if the extract call itself keeps failing.
     """
-    try:
-        response = await tavily_client.extract(urls=[url])
-        if response and "results" in response and len(response["results"]) > 0:
-            return response["results"][0].get("raw_content", "")
-        return ""
-    except Exception as e:
-        print(f"Content extraction error for {url}: {e}")
-        return ""
\ No newline at end of file
+    # Tracking-parameter variants of one page share a cache entry and a fetch
+    url = canonicalize_url(url)
+    cache = get_cache("extract")
+    key = extract_cache_key(url)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    return await extract_flight.do(key, lambda: extract_batcher.submit(url))
+
+
+async def extract_contents(urls: List[str], return_exceptions: bool = False) -> List[Any]:
+    """
+    Extract full page content for several URLs
+
+    Requests are merged with those from other tasks in the same batching
+    window and deduplicated, so a whole executor pass shares a few bulk
+    extract calls. Returns contents in the order of `urls`; with
+    `return_exceptions` failed URLs yield their exception instead of raising.
+    """
+    return await asyncio.gather(
+        *[extract_content(url) for url in urls],
+        return_exceptions=return_exceptions
+    )
+
+
+def coalescing_stats() -> Dict[str, Dict[str, int]]:
+    """Upstream calls made vs. callers that piggybacked on an in-flight call"""
+    return {
+        "search": search_flight.stats(),
+        "extract": extract_flight.stats(),
+        "extract_batches": extract_batcher.stats()
+    }
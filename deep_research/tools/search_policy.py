@@ -0,0 +1,217 @@
+"""
+Adaptive search depth for task queries
+
+A query first gets a cheap basic search for SEARCH_INITIAL_RESULTS results.
+It is escalated to an advanced search for MAX_SEARCH_RESULTS results with
+page content included only when the cheap results look weak: their best
+score, or the share of the query's terms they mention, is below threshold.
+Escalated results carry the full page as their content, so the executor does
+not need an extraction round-trip for them.
+
+The best score and coverage of every basic search are recorded in the
+"search_stats" cache (a persistent cache backend keeps them across runs).
+Once SEARCH_STATS_MIN_SAMPLES are recorded, each threshold follows the
+SEARCH_ESCALATION_QUANTILE of the recorded values, clamped to its configured
+bounds: a provider that scores everything low does not escalate every query,
+and one that scores everything high still escalates its weakest results.
+
+Every search that reaches Tavily is charged to the run's budget
+(SEARCH_BUDGET, bound per graph node by metered_searches); cached and
+coalesced searches are free. An escalation that does not fit keeps the basic
+results, and a query with no budget left is not searched.
+"""
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from deep_research import config
+from deep_research.telemetry import SEARCH_DECISIONS
+from deep_research.tools.cache import get_cache
+from deep_research.tools.passages import tokenize
+from deep_research.tools.search import search_needs_request, tavily_search
+
+_STATS_KEY = "basic_searches"
+
+
+class SearchBudgetExhausted(Exception):
+    """The run has used all of its search requests"""
+
+
+@dataclass
+class SearchBudget:
+    """Search requests used by a run, against an optional limit"""
+    used: int = 0
+    limit: int = 0
+
+    def try_spend(self) -> bool:
+        if self.limit and self.used >= self.limit:
+            return False
+        self.used += 1
+        return True
+
+
+_budget: ContextVar[Optional[SearchBudget]] = ContextVar("search_budget", default=None)
+
+
+@contextmanager
+def metered_searches(used: int = 0, limit: Optional[int] = None) -> Iterator[SearchBudget]:
+    """
+    Charge every search made inside the block (including child tasks) to one budget
+
+    `used` is what the run spent before the block; `budget.used - used` is
+    what the block spent.
+    """
+    budget = SearchBudget(used=used, limit=config.SEARCH_BUDGET if limit is None else limit)
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+
+
+@dataclass
+class SearchPolicyStats:
+    searches: int = 0
+    cached: int = 0
+    escalated: int = 0
+    over_budget: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def coverage(query: str, results: List[Dict[str, Any]]) -> float:
+    """Share of the query's terms that appear in any result's title or content"""
+    terms = set(tokenize(query))
+    if not terms:
+        return 1.0
+    seen = set()
+    for result in results:
+        seen.update(tokenize(f"{result.get('title', '')} {result.get('content', '')}"))
+    return len(terms & seen) / len(terms)
+
+
+def _quantile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def _clamp(value: float, bounds: Tuple[float, float]) -> float:
+    low, high = bounds
+    return max(low, min(high, value))
+
+
+class SearchPolicy:
+    """Decides per query whether basic results are good enough"""
+
+    def __init__(self, window: int = config.SEARCH_STATS_WINDOW):
+        self._lock = threading.Lock()
+        self._samples: Optional[deque] = None
+        self._window = window
+        self.stats = SearchPolicyStats()
+
+    def _recorded(self) -> deque:
+        if self._samples is None:
+            stored = get_cache("search_stats").get(_STATS_KEY) or []
+            self._samples = deque((tuple(s) for s in stored), maxlen=self._window)
+        return self._samples
+
+    def record(self, best_score: float, query_coverage: float) -> None:
+        with self._lock:
+            samples = self._recorded()
+            samples.append((best_score, query_coverage))
+            snapshot = [list(s) for s in samples]
+        get_cache("search_stats").set(_STATS_KEY, snapshot, config.SEARCH_STATS_TTL)
+
+    def thresholds(self) -> Tuple[float, float]:
+        """(minimum best score, minimum coverage) a basic search must reach"""
+        with self._lock:
+            samples = list(self._recorded())
+        if len(samples) < config.SEARCH_STATS_MIN_SAMPLES:
+            return config.SEARCH_MIN_SCORE, config.SEARCH_MIN_COVERAGE
+        q = config.SEARCH_ESCALATION_QUANTILE
+        return (
+            _clamp(_quantile([s for s, _ in samples], q), config.SEARCH_SCORE_BOUNDS),
+            _clamp(_quantile([c for _, c in samples], q), config.SEARCH_COVERAGE_BOUNDS),
+        )
+
+    def should_escalate(self, query: str, results: List[Dict[str, Any]]) -> bool:
+        """Judge basic results for `query`, recording them for later thresholds"""
+        min_score, min_coverage = self.thresholds()
+        best = max((r.get('score') or 0.0 for r in results), default=0.0)
+        covered = coverage(query, results)
+        self.record(best, covered)
+        return best < min_score or covered < min_coverage
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples = deque(maxlen=self._window)
+            self.stats = SearchPolicyStats()
+        get_cache("search_stats").clear()
+
+
+search_policy = SearchPolicy()
+
+
+def _spend(query: str, max_results: int, search_depth: str, include_raw_content: bool = False) -> bool:
+    """Charge a search to the run's budget if it will reach Tavily; False when the budget is used up"""
+    if not search_needs_request(query, max_results, search_depth, include_raw_content):
+        search_policy.stats.cached += 1
+        return True
+    budget = _budget.get()
+    if budget is not None and not budget.try_spend():
+        search_policy.stats.over_budget += 1
+        SEARCH_DECISIONS.inc(decision="over_budget")
+        return False
+    search_policy.stats.searches += 1
+    return True
+
+
+async def adaptive_search(query: str) -> List[Dict[str, Any]]:
+    """
+    Search results for a task query at the cheapest depth that looks sufficient
+
+    Escalated results have the page text as 'content' and 'full_content'
+    set. Raises SearchBudgetExhausted when the run has no searches left, and
+    UpstreamError if a search fails after retries.
+    """
+    max_results = config.SEARCH_INITIAL_RESULTS if config.SEARCH_ADAPTIVE else config.MAX_SEARCH_RESULTS
+    if not _spend(query, max_results, "basic"):
+        raise SearchBudgetExhausted(f"search budget of {_budget.get().limit} requests used up")
+
+    results = await tavily_search(query, max_results=max_results, search_depth="basic")
+    if not config.SEARCH_ADAPTIVE or not search_policy.should_escalate(query, results):
+        SEARCH_DECISIONS.inc(decision="basic")
+        return results
+    if not _spend(query, config.MAX_SEARCH_RESULTS, "advanced", include_raw_content=True):
+        return results
+
+    search_policy.stats.escalated += 1
+    SEARCH_DECISIONS.inc(decision="escalated")
+    try:
+        detailed = await tavily_search(
+            query,
+            max_results=config.MAX_SEARCH_RESULTS,
+            search_depth="advanced",
+            include_raw_content=True
+        )
+    except Exception as e:
+        # The basic results are still usable
+        print(f"Advanced search failed for '{query}', keeping basic results: {e}")
+        return results
+    if not detailed:
+        return results
+    return [
+        {**r, 'content': r['raw_content'], 'raw_content': "", 'full_content': True}
+        if r.get('raw_content') else r
+        for r in detailed
+    ]
+
+
+def search_policy_stats() -> Dict[str, Any]:
+    stats = search_policy.stats.as_dict()
+    stats["score_threshold"], stats["coverage_threshold"] = search_policy.thresholds()
+    return stats
@@ -0,0 +1,165 @@
+"""
+Cross-run cache of task results, matched on task intent
+
+Differently worded queries often plan the same sub-task. Each completed
+task is indexed by the terms of its description, search queries and output
+schema fields: a MinHash signature split into LSH bands finds candidate
+tasks in SQLite without scanning, and the exact Jaccard similarity of the
+term sets decides. A new task whose best match is at least
+TASK_CACHE_SIMILARITY and younger than TASK_CACHE_TTL reuses that result.
+"""
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from deep_research import config
+from deep_research.state import ResearchTask, TaskResult
+from deep_research.tools.passages import tokenize
+
+NUM_PERM = 64
+BANDS = 16  # rows per band = NUM_PERM // BANDS; ~0.7 Jaccard is where hits become likely
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+@dataclass
+class TaskCacheStats:
+    lookups: int = 0
+    hits: int = 0
+    stores: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def task_terms(task: ResearchTask) -> FrozenSet[str]:
+    """Unigrams and bigrams of the task's description, queries and schema fields"""
+    schema = task.get('output_schema') or {}
+    text = " ".join([task['description'], *task.get('search_queries', []), *map(str, schema)])
+    tokens = tokenize(text)
+    return frozenset(tokens) | frozenset(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+
+
+def minhash(terms: FrozenSet[str]) -> List[int]:
+    hashes = [int.from_bytes(hashlib.blake2b(t.encode(), digest_size=8).digest(), "big") for t in terms]
+    if not hashes:
+        return [_PRIME] * NUM_PERM
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def band_keys(signature: List[int]) -> List[str]:
+    rows = NUM_PERM // BANDS
+    return [
+        hashlib.blake2b(json.dumps(signature[i * rows:(i + 1) * rows]).encode(), digest_size=8).hexdigest()
+        for i in range(BANDS)
+    ]
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class TaskCache:
+    def __init__(self, path: str, max_entries: int = config.TASK_CACHE_MAX_ENTRIES):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.stats = TaskCacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS task_results ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, "
+            "terms TEXT NOT NULL, result TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS task_bands ("
+            "band INTEGER NOT NULL, bucket TEXT NOT NULL, entry_id INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS task_bands_bucket ON task_bands (band, bucket)")
+        self._conn.commit()
+
+    def lookup(self, task: ResearchTask) -> Optional[Tuple[float, TaskResult]]:
+        """(similarity, stored result) of the closest fresh match, or None"""
+        terms = task_terms(task)
+        buckets = band_keys(minhash(terms))
+        oldest = time.time() - config.TASK_CACHE_TTL
+        with self._lock:
+            self.stats.lookups += 1
+            rows = self._conn.execute(
+                "SELECT DISTINCT r.id, r.terms, r.result FROM task_bands b "
+                "JOIN task_results r ON r.id = b.entry_id "
+                f"WHERE r.created_at >= ? AND ({' OR '.join(['(b.band = ? AND b.bucket = ?)'] * BANDS)})",
+                [oldest, *[v for band, bucket in enumerate(buckets) for v in (band, bucket)]]
+            ).fetchall()
+
+        best: Optional[Tuple[float, str]] = None
+        for _, stored_terms, result in rows:
+            similarity = jaccard(terms, frozenset(json.loads(stored_terms)))
+            if similarity >= config.TASK_CACHE_SIMILARITY and (best is None or similarity > best[0]):
+                best = (similarity, result)
+        if best is None:
+            return None
+        self.stats.hits += 1
+        return best[0], json.loads(best[1])
+
+    def store(self, task: ResearchTask, result: TaskResult) -> None:
+        terms = task_terms(task)
+        buckets = band_keys(minhash(terms))
+        with self._lock:
+            self.stats.stores += 1
+            cursor = self._conn.execute(
+                "INSERT INTO task_results (created_at, terms, result) VALUES (?, ?, ?)",
+                (time.time(), json.dumps(sorted(terms)), json.dumps(result))
+            )
+            self._conn.executemany(
+                "INSERT INTO task_bands (band, bucket, entry_id) VALUES (?, ?, ?)",
+                [(band, bucket, cursor.lastrowid) for band, bucket in enumerate(buckets)]
+            )
+            self._prune()
+            self._conn.commit()
+
+    def _prune(self) -> None:
+        """Drop expired entries and the oldest beyond max_entries"""
+        deleted = self._conn.execute(
+            "DELETE FROM task_results WHERE created_at < ? OR id <= ("
+            "SELECT id FROM task_results ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (time.time() - config.TASK_CACHE_TTL, self.max_entries)
+        ).rowcount
+        if deleted:
+            self._conn.execute("DELETE FROM task_bands WHERE entry_id NOT IN (SELECT id FROM task_results)")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM task_results")
+            self._conn.execute("DELETE FROM task_bands")
+            self._conn.commit()
+
+
+_cache: Optional[TaskCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_task_cache() -> Optional[TaskCache]:
+    """The process-wide task cache, or None when TASK_CACHE_ENABLED is off"""
+    global _cache
+    if not config.TASK_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TaskCache(config.TASK_CACHE_PATH)
+    return _cache
+
+
+def task_cache_stats() -> Dict[str, int]:
+    return _cache.stats.as_dict() if _cache is not None else {}
@@ -0,0 +1,125 @@
+import asyncio
+import re
+import threading
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+from deep_research import config
+
+T = TypeVar("T")
+
+_tokenizer: Any = None
+_tokenizer_lock = threading.Lock()
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query"""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting prompts (~4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def count_tokens(text: str) -> int:
+    """Token count for budgeting prompts, estimated when no tokenizer is available"""
+    tokenizer = _get_tokenizer()
+    if not tokenizer:
+        return estimate_tokens(text)
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+
+def _get_tokenizer() -> Any:
+    """The config.TOKENIZER_ENCODING tiktoken encoding, loaded on first use; False if unavailable"""
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                _tokenizer = _load_tokenizer()
+    return _tokenizer
+
+
+def _load_tokenizer() -> Any:
+    if not config.TOKENIZER_ENCODING:
+        return False
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(config.TOKENIZER_ENCODING)
+    except Exception as e:
+        print(f"Tokenizer {config.TOKENIZER_ENCODING} unavailable, estimating token counts: {e}")
+        return False
+
+
+def search_cache_key(
+    query: str,
+    max_results: int,
+    search_depth: str,
+    include_raw_content: bool
+) -> str:
+    raw = "1" if include_raw_content else "0"
+    return f"{normalize_query(query)}|{max_results}|{search_depth}|{raw}"
+
+
+def extract_cache_key(url: str) -> str:
+    return url.strip()
+
+
+class _LeaderCancelled(Exception):
+    """The caller running a shared call was cancelled before it settled"""
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key
+
+    The first caller for a key runs the call; callers arriving while it is
+    in flight await the same future and receive the same result or exception.
+    If that first caller is cancelled, its followers are not: one of them
+    runs the call instead. Nothing is remembered once the call settles -
+    that is the cache's job.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # Shield so one follower being cancelled doesn't cancel the rest
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                return await self.do(key, fn)
+
+        self.calls += 1
+        future = asyncio.get_running_loop().create_future()
+        # Mark the exception retrieved so lone failures don't warn on GC
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Only this caller was cancelled; send its followers back to retry
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight)
+        }